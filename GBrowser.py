@@ -2,57 +2,266 @@
 
 import sys
 import ctypes
-from ctypes import wintypes
 import os
 import re
 import json
 import traceback
+import argparse
 import threading
 import time
 from urllib.parse import urlparse
+from html.parser import HTMLParser
 import shutil
+import codecs
+import heapq
+import sqlite3
+import mmap
+import struct
+import zlib
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
 
 CONFIG_DIR = os.path.join(os.path.expanduser("~"), ".gorstak_browser")
 CONFIG_FILE = os.path.join(CONFIG_DIR, "CONFIG_FILE")
 CREDENTIALS_FILE = os.path.join(CONFIG_DIR, "credentials.json")
+FILTERS_DIR = os.path.join(CONFIG_DIR, "filters")
+FILTER_CACHE_FILE = os.path.join(CONFIG_DIR, "filters.idx")
+ADBLOCK_STATS_FILE = os.path.join(CONFIG_DIR, "adblock_stats.json")
+BOOKMARKS_DB = os.path.join(CONFIG_DIR, "bookmarks.sqlite3")
+CACHE_PID_FILE = os.path.join(CONFIG_DIR, "browser.pid")
+CACHE_PURGE_FILE = os.path.join(CONFIG_DIR, "cache_purge.json")
 
 
-def _clear_stale_locks():
-    """Clear stale lock files and cache that might be left from crashed sessions."""
+class StartupProfile:
+    """Phase timestamps from module load to the first painted frame (--startup-profile)"""
     
-    lock_files = [
-        os.path.join(CONFIG_DIR, "storage", "lockfile"),
-        os.path.join(CONFIG_DIR, "cache", "lockfile"),
-        os.path.join(CONFIG_DIR, "storage", "GPUCache", "lockfile"),
-        os.path.join(CONFIG_DIR, "cache", "GPUCache", "lockfile"),
-    ]
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.marks = []
+        self.enabled = False
+    
+    def enable(self):
+        """Start printing; phases recorded before this are printed at once"""
+        self.enabled = True
+        for phase, t in self.marks:
+            self._print(phase, t)
+    
+    def mark(self, phase):
+        t = time.perf_counter()
+        self.marks.append((phase, t))
+        if self.enabled:
+            self._print(phase, t)
+    
+    def _print(self, phase, t):
+        print(f"[Startup] {(t - self.t0) * 1000:8.1f} ms  {phase}")
+
+
+STARTUP = StartupProfile()
+
+# Web engine data kept across launches: path under CONFIG_DIR -> (default quota in MB,
+# subdirectory whose entries are evicted one at a time, or None to purge the whole directory)
+MANAGED_CACHES = {
+    "storage/GPUCache": (256, None),
+    "cache/GPUCache": (256, None),
+    "storage/Service Worker": (512, "CacheStorage"),
+    "storage/IndexedDB": (512, ""),
+    "storage/Cache": (512, None),
+    "storage/blob_storage": (256, None),
+    "storage/QuotaManager": (64, None),
+}
+LOCK_FILES = ["storage/lockfile", "cache/lockfile", "storage/GPUCache/lockfile", "cache/GPUCache/lockfile"]
+
+
+def pid_alive(pid):
+    """True if a process with this id is still running"""
+    if pid <= 0:
+        return False
+    if sys.platform == "win32":
+        from ctypes import wintypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return kernel32.GetLastError() == 5  # access denied: exists, owned by someone else
+        code = wintypes.DWORD()
+        ok = kernel32.GetExitCodeProcess(handle, ctypes.byref(code))
+        kernel32.CloseHandle(handle)
+        return not ok or code.value == 259  # STILL_ACTIVE
+    try:
+        os.kill(pid, 0)
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+    return True
+
+
+def _tree_stats(path):
+    """(total bytes, newest mtime) of a file or directory tree"""
+    st = os.stat(path, follow_symlinks=False)
+    if not os.path.isdir(path) or os.path.islink(path):
+        return st.st_size, st.st_mtime
+    size, newest = 0, st.st_mtime
+    stack = [path]
+    while stack:
+        with os.scandir(stack.pop()) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                    newest = max(newest, entry.stat(follow_symlinks=False).st_mtime)
+                else:
+                    est = entry.stat(follow_symlinks=False)
+                    size += est.st_size
+                    newest = max(newest, est.st_mtime)
+    return size, newest
+
+
+class CacheManager:
+    """Keeps web engine caches warm across launches while bounding their size"""
+    
+    def __init__(self, config_dir=CONFIG_DIR, quotas=None):
+        self.config_dir = config_dir
+        self.pid_file = os.path.join(config_dir, os.path.basename(CACHE_PID_FILE))
+        self.purge_file = os.path.join(config_dir, os.path.basename(CACHE_PURGE_FILE))
+        self.quotas = {name: mb for name, (mb, _) in MANAGED_CACHES.items()}
+        for name, mb in (quotas or {}).items():
+            if name in MANAGED_CACHES:
+                self.quotas[name] = mb
+        self.owner = True
+        self.unclean = False
+        self._thread = None
+    
+    def _path(self, name):
+        return os.path.join(self.config_dir, *name.split("/"))
     
-    for lock_file in lock_files:
+    def startup(self):
+        """Clean up after the previous session; call before the profile is created"""
+        previous = 0
         try:
-            if os.path.exists(lock_file):
-                os.remove(lock_file)
-        except:
+            with open(self.pid_file, "r") as f:
+                previous = int(f.read().strip() or 0)
+        except (OSError, ValueError):
             pass
+        if previous and previous != os.getpid() and pid_alive(previous):
+            # Another instance owns the storage; leave its locks and data alone
+            self.owner = False
+            print(f"[Cache] Profile in use by PID {previous}, skipping cleanup")
+            return self
+        self.unclean = bool(previous)
+        if self.unclean:
+            print(f"[Cache] PID {previous} did not shut down cleanly")
+            for lock in LOCK_FILES:
+                try:
+                    os.remove(self._path(lock))
+                except OSError:
+                    pass
+        
+        purge = self._take_pending_purge()
+        if self.unclean:
+            # Shader caches written during a crash are the usual cause of a blank GPU process
+            purge.update({self._path("storage/GPUCache"), self._path("cache/GPUCache")})
+        for path in purge:
+            self._remove(path)
+        
+        try:
+            with open(self.pid_file, "w") as f:
+                f.write(str(os.getpid()))
+        except OSError as e:
+            print(f"[Cache] Could not write {self.pid_file}: {e}")
+        return self
     
-    cache_dirs = [
-        os.path.join(CONFIG_DIR, "storage", "GPUCache"),
-        os.path.join(CONFIG_DIR, "cache", "GPUCache"),
-        os.path.join(CONFIG_DIR, "storage", "Service Worker"),
-        os.path.join(CONFIG_DIR, "storage", "QuotaManager"),
-        os.path.join(CONFIG_DIR, "storage", "IndexedDB"),
-        os.path.join(CONFIG_DIR, "storage", "Cache"),
-        os.path.join(CONFIG_DIR, "storage", "blob_storage"),
-    ]
-    
-    for cache_dir in cache_dirs:
+    def release(self):
+        """Mark a clean shutdown"""
+        if not self.owner:
+            return
         try:
-            if os.path.exists(cache_dir):
-                shutil.rmtree(cache_dir, ignore_errors=True)
-        except:
+            os.remove(self.pid_file)
+        except OSError:
             pass
     
-# Run cleanup before anything else
-_clear_stale_locks()
+    def _take_pending_purge(self):
+        try:
+            with open(self.purge_file, "r", encoding="utf-8") as f:
+                names = json.load(f)
+            os.remove(self.purge_file)
+        except (OSError, ValueError):
+            return set()
+        root = os.path.realpath(self.config_dir)
+        paths = set()
+        for name in names if isinstance(names, list) else []:
+            path = os.path.realpath(os.path.join(self.config_dir, *str(name).split("/")))
+            if path.startswith(root + os.sep):
+                paths.add(path)
+        return paths
+    
+    def _remove(self, path):
+        try:
+            if os.path.isdir(path) and not os.path.islink(path):
+                shutil.rmtree(path, ignore_errors=True)
+            elif os.path.lexists(path):
+                os.remove(path)
+            else:
+                return
+            print(f"[Cache] Purged {os.path.relpath(path, self.config_dir)}")
+        except OSError as e:
+            print(f"[Cache] Could not purge {path}: {e}")
+    
+    def scan_async(self):
+        """Measure the caches on a background thread"""
+        # Only records what to purge: deleting files the engine has open is unsafe, so
+        # startup() does the purge on the next launch, before the profile opens its storage
+        if not self.owner or (self._thread and self._thread.is_alive()):
+            return
+        self._thread = threading.Thread(target=self.scan, daemon=True)
+        self._thread.start()
+    
+    def scan(self):
+        """Pick what to purge at the next launch: corrupt entries, then least recently used ones over quota"""
+        purge = []
+        for name, (_, unit_dir) in MANAGED_CACHES.items():
+            path = self._path(name)
+            if not os.path.lexists(path):
+                continue
+            quota = self.quotas[name] * 1024 * 1024
+            try:
+                if not os.path.isdir(path):
+                    purge.append(name)  # a file where the engine expects a directory
+                    continue
+                total, _ = _tree_stats(path)
+                if total <= quota:
+                    continue
+                units = []
+                if unit_dir is not None:
+                    base = os.path.join(path, unit_dir) if unit_dir else path
+                    if os.path.isdir(base):
+                        for entry in os.listdir(base):
+                            size, mtime = _tree_stats(os.path.join(base, entry))
+                            rel = "/".join(p for p in (name, unit_dir, entry) if p)
+                            units.append((mtime, size, rel))
+                units.sort()
+                while units and total > quota:
+                    _, size, rel = units.pop(0)
+                    purge.append(rel)
+                    total -= size
+                if total > quota:
+                    purge.append(name)
+                print(f"[Cache] {name} over its {self.quotas[name]} MB quota")
+            except OSError as e:
+                print(f"[Cache] Could not read {name}, purging it: {e}")
+                purge.append(name)
+        
+        try:
+            if purge:
+                tmp = self.purge_file + ".tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(purge, f, indent=2)
+                os.replace(tmp, self.purge_file)
+                print(f"[Cache] {len(purge)} entries will be purged at next launch")
+            elif os.path.exists(self.purge_file):
+                os.remove(self.purge_file)
+        except OSError as e:
+            print(f"[Cache] Could not write {self.purge_file}: {e}")
+        return purge
+
 
 os.makedirs(os.path.join(CONFIG_DIR, "storage"), exist_ok=True)
 os.makedirs(os.path.join(CONFIG_DIR, "cache"), exist_ok=True)
@@ -61,17 +270,17 @@ os.makedirs(os.path.join(CONFIG_DIR, "cache"), exist_ok=True)
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QPushButton, QLineEdit, QLabel, QToolButton, QMenu, QFileDialog,
-    QMessageBox, QSizePolicy, QTabWidget, QTabBar
+    QMessageBox, QSizePolicy, QTabWidget, QTabBar, QProgressBar,
+    QDialog, QListWidget, QListWidgetItem
 )
 from PyQt6.QtWebEngineWidgets import QWebEngineView
 from PyQt6.QtWebEngineCore import (
     QWebEnginePage, QWebEngineProfile, QWebEngineScript, QWebEngineSettings,
-    QWebEngineUrlRequestInterceptor  # Added for ad blocking
+    QWebEngineUrlRequestInterceptor, QWebEngineUrlRequestInfo  # Added for ad blocking
 )
-from PyQt6.QtCore import Qt, QUrl, QSize, QTimer, QByteArray
+from PyQt6.QtCore import Qt, QUrl, QSize, QTimer, QByteArray, QThread, QEvent, QPoint, pyqtSignal
 from PyQt6.QtGui import QFont, QPixmap, QPainter, QIcon, QAction
-from PyQt6.QtSvg import QSvgRenderer
-from bs4 import BeautifulSoup
+STARTUP.mark("Qt modules imported")
 
 
 AD_DOMAINS = {
@@ -122,34 +331,1089 @@ AD_URL_PATTERNS = [
 ]
 
 
+class DomainSuffixIndex:
+    """Hashed-suffix lookup: a host matches if it or any parent domain is listed"""
+    
+    def __init__(self, domains=()):
+        self._domains = {}
+        for domain in domains:
+            self.add(domain)
+    
+    def add(self, domain, value=True):
+        domain = domain.strip().strip(".").lower()
+        if domain:
+            self._domains[domain] = value
+    
+    def lookup(self, host):
+        """Return the value stored for the closest listed suffix of host, or None"""
+        # One dict probe per label of host, however many domains are indexed
+        domains = self._domains
+        if not domains or not host:
+            return None
+        while True:
+            value = domains.get(host)
+            if value is not None:
+                return value
+            dot = host.find(".")
+            if dot < 0:
+                return None
+            host = host[dot + 1:]
+    
+    def __contains__(self, host):
+        return self.lookup(host) is not None
+    
+    def __len__(self):
+        return len(self._domains)
+
+
+_REGEX_METACHARS = set("\\.^$*+?{}[]|()")
+
+
+def _literal_trie_regex(literals):
+    """Build a prefix-factored alternation that matches any of the literals"""
+    # Shared prefixes are merged, so the engine branches per character instead of retrying every literal
+    trie = {}
+    for literal in literals:
+        node = trie
+        for ch in literal:
+            node = node.setdefault(ch, {})
+        node[""] = True
+    
+    def build(node):
+        # A literal ends here; longer continuations cannot change the outcome
+        if "" in node:
+            return ""
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items())]
+        if len(branches) == 1:
+            return branches[0]
+        return "(?:" + "|".join(branches) + ")"
+    
+    return build(trie)
+
+
+class UrlPatternMatcher:
+    """All URL patterns compiled once into a single-pass matcher; callers pass a lowercased URL"""
+    
+    def __init__(self, patterns=()):
+        # Plain substrings share one prefix-factored regex, regex syntax goes into a second alternation
+        literals = []
+        expressions = []
+        for pattern in patterns:
+            if not pattern:
+                continue
+            if _REGEX_METACHARS.intersection(pattern):
+                expressions.append(pattern)
+            else:
+                literals.append(pattern.lower())
+        
+        self._literal_re = re.compile(_literal_trie_regex(literals)) if literals else None
+        self._expression_re = None
+        if expressions:
+            self._expression_re = re.compile(
+                "|".join("(?:%s)" % p for p in expressions), re.IGNORECASE
+            )
+    
+    def search(self, url):
+        """Return True if any pattern occurs in url"""
+        if self._literal_re is not None and self._literal_re.search(url):
+            return True
+        if self._expression_re is not None and self._expression_re.search(url):
+            return True
+        return False
+
+
+# ------------------------
+# Filter lists (Adblock Plus / EasyList syntax)
+# ------------------------
+_FILTER_CACHE_MAGIC = b"GBFI"
+_FILTER_CACHE_VERSION = 5
+
+_URL_TOKEN_RE = re.compile(r"[a-z0-9%]{3,}")
+_RULE_TOKEN_RE = re.compile(r"(?<![a-z0-9%*])[a-z0-9%]{3,}(?![a-z0-9%*])")
+_HOST_RULE_RE = re.compile(r"^\|\|([a-z0-9.-]+)\^\|?$")
+_EXCEPTION_HOST_RE = re.compile(r"^@@\|\|([a-z0-9.-]+)")
+_COSMETIC_RE = re.compile(r"^([^#]*)#(@?)#(.+)$")
+# Procedural / scriptlet syntax that plain CSS cannot express
+_UNSUPPORTED_SELECTOR_MARKERS = ("+js(", ":-abp-", ":has-text(", ":xpath(", ":style(", ":matches-css", ":upward(", ":remove(")
+# Key under which generic hide selectors with per-domain exceptions are stored
+_CONDITIONAL_GENERIC = "~"
+_COMMON_TOKENS = {"http", "https", "www", "com", "net", "org", "html", "php"}
+# ABP "^": anything but a letter, digit or one of _-.%, or the end of the URL
+_SEPARATOR_REGEX = r"(?:[^\w\-.%]|$)"
+_U32 = struct.Struct("<I")
+_U32_PAIR = struct.Struct("<II")
+
+
+# ABP resource type options as bits of FilterRule.type_mask
+RESOURCE_TYPE_BITS = {
+    name: 1 << i for i, name in enumerate((
+        "document", "subdocument", "stylesheet", "script", "image", "font", "object",
+        "xmlhttprequest", "media", "ping", "websocket", "other",
+    ))
+}
+_RESOURCE_TYPE_ALIASES = {
+    "xhr": "xmlhttprequest", "frame": "subdocument", "css": "stylesheet",
+    "object-subrequest": "object",
+}
+_ALL_TYPES_MASK = sum(RESOURCE_TYPE_BITS.values())
+# Rules without type options apply to everything but the top-level document
+_DEFAULT_TYPE_MASK = _ALL_TYPES_MASK & ~RESOURCE_TYPE_BITS["document"]
+
+# Fetched outside any page, so only the profile-level interceptor sees them
+WORKER_RESOURCE_TYPES = ("ResourceTypeWorker", "ResourceTypeSharedWorker", "ResourceTypeServiceWorker")
+
+# QWebEngineUrlRequestInfo.ResourceType member name -> ABP type
+QT_RESOURCE_TYPES = {
+    "ResourceTypeMainFrame": "document",
+    "ResourceTypeNavigationPreloadMainFrame": "document",
+    "ResourceTypeSubFrame": "subdocument",
+    "ResourceTypeNavigationPreloadSubFrame": "subdocument",
+    "ResourceTypeStylesheet": "stylesheet",
+    "ResourceTypeScript": "script",
+    "ResourceTypeWorker": "script",
+    "ResourceTypeSharedWorker": "script",
+    "ResourceTypeServiceWorker": "script",
+    "ResourceTypeImage": "image",
+    "ResourceTypeFavicon": "image",
+    "ResourceTypeFontResource": "font",
+    "ResourceTypeObject": "object",
+    "ResourceTypePluginResource": "object",
+    "ResourceTypeXhr": "xmlhttprequest",
+    "ResourceTypeMedia": "media",
+    "ResourceTypePing": "ping",
+    "ResourceTypeCspReport": "ping",
+    "ResourceTypeWebSocket": "websocket",
+}
+
+
+def _base_domain(host):
+    """Approximate registrable domain: last two labels, three for ccTLD second levels"""
+    labels = host.split(".")
+    if len(labels) > 2 and len(labels[-1]) == 2 and labels[-2] in ("co", "com", "net", "org", "gov", "ac", "edu"):
+        return ".".join(labels[-3:])
+    return ".".join(labels[-2:])
+
+
+def _is_third_party(host, first_party_host):
+    if not first_party_host:
+        return False
+    return _base_domain(host) != _base_domain(first_party_host)
+
+
+def _host_in_domains(host, domains):
+    """True if host equals or is a subdomain of any entry in domains"""
+    while host:
+        if host in domains:
+            return True
+        dot = host.find(".")
+        if dot < 0:
+            return False
+        host = host[dot + 1:]
+    return False
+
+
+def _abp_pattern_to_regex(pattern):
+    """Translate the URL part of an ABP rule into a regular expression"""
+    if len(pattern) > 2 and pattern.startswith("/") and pattern.endswith("/"):
+        return pattern[1:-1]
+    prefix = ""
+    suffix = ""
+    if pattern.startswith("||"):
+        prefix = r"^[a-z][a-z0-9+.\-]*://(?:[^/?#]*\.)?"
+        pattern = pattern[2:]
+    elif pattern.startswith("|"):
+        prefix = "^"
+        pattern = pattern[1:]
+    if pattern.endswith("|"):
+        suffix = "$"
+        pattern = pattern[:-1]
+    if not prefix:
+        pattern = pattern.lstrip("*")
+    if not suffix:
+        pattern = pattern.rstrip("*")
+    parts = []
+    for ch in pattern:
+        if ch == "*":
+            if not parts or parts[-1] != ".*":
+                parts.append(".*")
+        elif ch == "^":
+            parts.append(_SEPARATOR_REGEX)
+        else:
+            parts.append(re.escape(ch))
+    return prefix + "".join(parts) + suffix
+
+
+def _abp_pattern_token(pattern):
+    """Literal token a URL must contain for this pattern to match, or "" if there is none"""
+    # Only runs bounded by separators or anchors qualify, so the token is a whole
+    # [a-z0-9%] run of any matching URL
+    if len(pattern) > 2 and pattern.startswith("/") and pattern.endswith("/"):
+        return ""
+    text = ("|" + pattern.lstrip("|")) if pattern.startswith("|") else ("*" + pattern)
+    if not text.endswith("|"):
+        text += "*"
+    candidates = _RULE_TOKEN_RE.findall(text)
+    if not candidates:
+        return ""
+    preferred = [t for t in candidates if t not in _COMMON_TOKENS] or candidates
+    return max(preferred, key=len)
+
+
+def _parse_cosmetic_rule(line):
+    """Parse `domains##selector` / `domains#@#selector` into (include, exclude, is_exception, selector) or None"""
+    line = line.strip()
+    if line.startswith("!"):
+        return None
+    match = _COSMETIC_RE.match(line)
+    if not match:
+        return None
+    domains, exception, selector = match.groups()
+    selector = selector.strip()
+    if not selector or "{" in selector or "}" in selector:
+        return None
+    if any(marker in selector for marker in _UNSUPPORTED_SELECTOR_MARKERS):
+        return None
+    include_domains = []
+    exclude_domains = []
+    for domain in domains.lower().split(","):
+        domain = domain.strip()
+        if domain.startswith("~"):
+            exclude_domains.append(domain[1:])
+        elif domain:
+            include_domains.append(domain)
+    return include_domains, exclude_domains, bool(exception), selector
+
+
+def _hiding_css(selectors):
+    # One rule per selector: an invalid selector then only drops itself
+    return "".join("%s{display:none!important}\n" % sel for sel in sorted(selectors))
+
+
+class FilterRule:
+    """One network filter rule, e.g. `||ads.example^$third-party` or `@@/banner/`"""
+    
+    __slots__ = ("text", "is_exception", "pattern", "token", "third_party", "type_mask",
+                 "include_domains", "exclude_domains", "_regex")
+    
+    def __init__(self, text, is_exception, pattern, third_party=None,
+                 include_domains=(), exclude_domains=(), type_mask=_DEFAULT_TYPE_MASK):
+        self.text = text
+        self.is_exception = is_exception
+        self.pattern = pattern
+        self.token = _abp_pattern_token(pattern)
+        self.third_party = third_party
+        self.type_mask = type_mask
+        self.include_domains = frozenset(include_domains)
+        self.exclude_domains = frozenset(exclude_domains)
+        self._regex = None
+    
+    @classmethod
+    def parse(cls, text):
+        """Parse one filter-list line; returns None for comments, cosmetic
+        rules and rules using options this engine does not understand."""
+        text = text.strip()
+        if not text or text[0] in "![":
+            return None
+        if "##" in text or "#@#" in text or "#?#" in text or "#$#" in text:
+            return None
+        
+        body = text
+        is_exception = body.startswith("@@")
+        if is_exception:
+            body = body[2:]
+        
+        pattern, options = body, ""
+        is_regex = len(body) > 2 and body.startswith("/") and body.endswith("/")
+        if not is_regex and "$" in body:
+            idx = body.rfind("$")
+            pattern, options = body[:idx], body[idx + 1:]
+        
+        third_party = None
+        include_domains = []
+        exclude_domains = []
+        include_types = 0
+        exclude_types = 0
+        for option in options.split(",") if options else ():
+            option = option.strip().lower()
+            negated = option.startswith("~")
+            type_name = _RESOURCE_TYPE_ALIASES.get(option.lstrip("~"), option.lstrip("~"))
+            if option in ("third-party", "3p", "~first-party"):
+                third_party = True
+            elif option in ("~third-party", "first-party", "1p"):
+                third_party = False
+            elif option.startswith("domain="):
+                for domain in option[7:].split("|"):
+                    if domain.startswith("~"):
+                        exclude_domains.append(domain[1:])
+                    elif domain:
+                        include_domains.append(domain)
+            elif type_name in RESOURCE_TYPE_BITS:
+                if negated:
+                    exclude_types |= RESOURCE_TYPE_BITS[type_name]
+                else:
+                    include_types |= RESOURCE_TYPE_BITS[type_name]
+            else:
+                return None
+        type_mask = (include_types or _DEFAULT_TYPE_MASK) & ~exclude_types
+        if not type_mask:
+            return None
+        
+        is_regex = len(pattern) > 2 and pattern.startswith("/") and pattern.endswith("/")
+        if not is_regex:
+            pattern = pattern.lower()
+        if not pattern.strip("*") and not (include_domains or third_party is not None or include_types):
+            return None
+        return cls(text, is_exception, pattern, third_party, include_domains, exclude_domains, type_mask)
+    
+    @property
+    def regex(self):
+        # Compiled on first use: most of a large list is never consulted
+        if self._regex is None:
+            try:
+                self._regex = re.compile(_abp_pattern_to_regex(self.pattern), re.IGNORECASE)
+            except re.error:
+                self._regex = re.compile(r"(?!)")
+        return self._regex
+    
+    def matches(self, url, first_party_host, third_party, type_bit):
+        # Cheap integer checks first; the regex only runs for applicable rules
+        if not self.type_mask & type_bit:
+            return False
+        if self.third_party is not None and self.third_party != third_party:
+            return False
+        if self.include_domains and not _host_in_domains(first_party_host, self.include_domains):
+            return False
+        if self.exclude_domains and _host_in_domains(first_party_host, self.exclude_domains):
+            return False
+        return self.regex.search(url) is not None
+
+
+class _MappedStringTable:
+    """Sorted byte-string table read straight out of the mapped cache file; bisect works on it"""
+    
+    def __init__(self, buf, offset):
+        # Layout: u32 count, (count + 1) u32 end offsets, then the entries blob
+        self._buf = buf
+        self._count = _U32.unpack_from(buf, offset)[0]
+        self._offsets = offset + 4
+        self._blob = self._offsets + 4 * (self._count + 1)
+    
+    def __len__(self):
+        return self._count
+    
+    def __getitem__(self, i):
+        if not 0 <= i < self._count:
+            raise IndexError(i)
+        start, end = _U32_PAIR.unpack_from(self._buf, self._offsets + 4 * i)
+        return self._buf[self._blob + start:self._blob + end]
+    
+    def find_prefix(self, prefix):
+        """Yield entries starting with prefix (contiguous since the table is sorted)"""
+        i = bisect_left(self, prefix)
+        while i < self._count:
+            entry = self[i]
+            if not entry.startswith(prefix):
+                break
+            yield entry
+            i += 1
+
+
+class _MappedHostTable(_MappedStringTable):
+    """Host suffix lookup over a mapped, sorted domain table"""
+    
+    def lookup(self, host):
+        if not self._count or not host:
+            return None
+        key = host.encode()
+        while True:
+            i = bisect_left(self, key)
+            if i < self._count and self[i] == key:
+                return True
+            dot = key.find(b".")
+            if dot < 0:
+                return None
+            key = key[dot + 1:]
+    
+    def __contains__(self, host):
+        return self.lookup(host) is not None
+
+
+class _MappedSelectorTable(_MappedStringTable):
+    """Domain -> element-hiding selectors over mapped `domain NUL selector` entries"""
+    
+    def __init__(self, buf, offset):
+        super().__init__(buf, offset)
+        self._domains = {}  # only domains that have selectors, so it is bounded by the table
+    
+    def get(self, domain, default=()):
+        selectors = self._domains.get(domain)
+        if selectors is None:
+            selectors = [entry[entry.index(b"\0") + 1:].decode("utf-8", "replace")
+                         for entry in self.find_prefix(domain.encode() + b"\0")]
+            if not selectors:
+                return default
+            self._domains[domain] = selectors
+        return selectors
+
+
+class _MappedRuleTable(_MappedStringTable):
+    """Token -> rules lookup over mapped `token NUL native-fields NUL rule-text` entries, parsed on first use"""
+    
+    def __init__(self, buf, offset):
+        super().__init__(buf, offset)
+        # Only tokens that have rules: URL tokens (session ids, hashes, cache busters)
+        # are unbounded, the table's tokens are not
+        self._buckets = {}
+    
+    def get(self, token, default=()):
+        bucket = self._buckets.get(token)
+        if bucket is None:
+            entries = list(self.find_prefix(token.encode() + b"\0"))
+            if not entries:
+                return default
+            bucket = []
+            for entry in entries:
+                rule = FilterRule.parse(entry[entry.rindex(b"\0") + 1:].decode("utf-8", "replace"))
+                if rule is not None:
+                    bucket.append(rule)
+            self._buckets[token] = bucket
+        return bucket or default
+
+
+_NATIVE_FILTER_LIB = {"win32": "gbfilter.dll", "darwin": "gbfilter.dylib"}.get(sys.platform, "gbfilter.so")
+
+
+class NativeFilterMatcher:
+    """Host and URL-rule verdicts from the optional gbfilter library (see gbfilter.c), read
+    in place from the FilterSet's mapping; ctypes.CDLL drops the GIL for each call"""
+    
+    ABI_VERSION = 2
+    _lib = None
+    _lib_loaded = False
+    
+    def __init__(self, lib, handle, view):
+        self._lib = lib
+        self._handle = handle
+        self._view = view  # keeps the mapping exported while the library reads it
+    
+    @classmethod
+    def _open_library(cls, path):
+        lib = ctypes.CDLL(path)
+        if lib.gbf_abi_version() != cls.ABI_VERSION:
+            raise OSError("built for a different GBrowser version, rebuild it from gbfilter.c")
+        lib.gbf_open.argtypes = [ctypes.c_void_p, ctypes.c_size_t, ctypes.POINTER(ctypes.c_uint64)]
+        lib.gbf_open.restype = ctypes.c_void_p
+        lib.gbf_close.argtypes = [ctypes.c_void_p]
+        lib.gbf_close.restype = None
+        lib.gbf_host_verdict.argtypes = [ctypes.c_void_p, ctypes.c_char_p, ctypes.c_size_t]
+        lib.gbf_host_verdict.restype = ctypes.c_int
+        lib.gbf_url_verdict.argtypes = [ctypes.c_void_p, ctypes.c_char_p, ctypes.c_size_t,
+                                        ctypes.c_char_p, ctypes.c_size_t,
+                                        ctypes.c_int, ctypes.c_uint32, ctypes.c_int]
+        lib.gbf_url_verdict.restype = ctypes.c_int
+        return lib
+    
+    @classmethod
+    def _load_library(cls):
+        if cls._lib_loaded:
+            return cls._lib
+        cls._lib_loaded = True
+        for directory in (os.path.dirname(os.path.abspath(__file__)), CONFIG_DIR):
+            path = os.path.join(directory, _NATIVE_FILTER_LIB)
+            if not os.path.exists(path):
+                continue
+            try:
+                cls._lib = cls._open_library(path)
+            except (OSError, AttributeError) as e:
+                print(f"[AdBlock] Failed to load {path}: {e}")
+                continue
+            break
+        return cls._lib
+    
+    @classmethod
+    def attach(cls, buf, sections):
+        """Matcher over a writable index mapping, or None if the library is missing or rejects it"""
+        lib = cls._load_library()
+        if lib is None:
+            return None
+        view = (ctypes.c_char * len(buf)).from_buffer(buf)
+        handle = lib.gbf_open(ctypes.addressof(view), len(buf), (ctypes.c_uint64 * 4)(*sections))
+        if not handle:
+            print("[AdBlock] Native matcher rejected the filter cache")
+            return None
+        return cls(lib, handle, view)
+    
+    def host_verdict(self, host):
+        key = host.encode()
+        result = self._lib.gbf_host_verdict(self._handle, key, len(key))
+        return None if result < 0 else bool(result)
+    
+    def url_verdict(self, url, first_party_host, third_party, type_bit, blocked):
+        """See FilterSet.url_verdict; None when a /regex/ rule needs the Python matcher"""
+        url = url.encode()
+        first_party_host = first_party_host.encode()
+        result = self._lib.gbf_url_verdict(self._handle, url, len(url), first_party_host, len(first_party_host),
+                                           bool(third_party), type_bit, bool(blocked))
+        return None if result < 0 else bool(result)
+    
+    def __del__(self):
+        if self._handle:
+            self._lib.gbf_close(self._handle)
+            self._handle = None
+
+
+class FilterSet:
+    """Compiled filter lists: host tables plus token-bucketed URL rules"""
+    
+    CSS_CACHE_SIZE = 256
+    
+    def __init__(self, block_hosts, allow_hosts, block_rules, allow_rules, rule_count=0,
+                 hide=None, hide_allow=None, generic_css=""):
+        self.block_hosts = block_hosts
+        self.allow_hosts = allow_hosts
+        self.block_rules = block_rules
+        self.allow_rules = allow_rules
+        self.rule_count = rule_count
+        # Element hiding: domain -> selectors, plus the precompiled generic stylesheet
+        self.hide = hide if hide is not None else {}
+        self.hide_allow = hide_allow if hide_allow is not None else {}
+        self.generic_css = generic_css
+        self.native = None  # NativeFilterMatcher over the mapping, if enabled and available
+        self._css_cache = OrderedDict()
+        self._mapping = None
+    
+    @staticmethod
+    def _match_rules(table, url, first_party_host, third_party, type_bit):
+        for token in {"", *_URL_TOKEN_RE.findall(url)}:
+            for rule in table.get(token, ()):
+                if rule.matches(url, first_party_host, third_party, type_bit):
+                    return rule
+        return None
+    
+    def host_verdict(self, host):
+        """Decision from the host tables alone: True block, False allow, None scan URL rules"""
+        if self.native is not None:
+            return self.native.host_verdict(host)
+        if self.allow_hosts.lookup(host) is not None:
+            return False
+        if self.block_hosts.lookup(host) is not None:
+            return True
+        return None
+    
+    def rule_blocks(self, url, first_party_host, third_party, type_bit):
+        return self._match_rules(self.block_rules, url, first_party_host, third_party, type_bit) is not None
+    
+    def rule_allows(self, url, first_party_host, third_party, type_bit):
+        return self._match_rules(self.allow_rules, url, first_party_host, third_party, type_bit) is not None
+    
+    def url_verdict(self, url, first_party_host, third_party, type_bit, blocked=False):
+        """Whether to block once the URL rules are applied on top of blocked (the caller's verdict so far)"""
+        # The native matcher's "^" treats any non-ASCII byte as a letter, unlike re's \w
+        if self.native is not None and url.isascii():
+            verdict = self.native.url_verdict(url, first_party_host, third_party, type_bit, blocked)
+            if verdict is not None:
+                return verdict
+        blocked = blocked or self.rule_blocks(url, first_party_host, third_party, type_bit)
+        # @@ exception rules override any block
+        return blocked and not self.rule_allows(url, first_party_host, third_party, type_bit)
+    
+    def site_css(self, host):
+        """Element-hiding stylesheet for host, on top of generic_css"""
+        css = self._css_cache.get(host)
+        if css is not None:
+            self._css_cache.move_to_end(host)
+            return css
+        
+        selectors = set(self.hide.get(_CONDITIONAL_GENERIC, ()))
+        allowed = set()
+        domain = host
+        while domain:
+            selectors.update(self.hide.get(domain, ()))
+            allowed.update(self.hide_allow.get(domain, ()))
+            dot = domain.find(".")
+            domain = domain[dot + 1:] if dot >= 0 else ""
+        css = _hiding_css(selectors - allowed)
+        
+        self._css_cache[host] = css
+        if len(self._css_cache) > self.CSS_CACHE_SIZE:
+            self._css_cache.popitem(last=False)
+        return css
+    
+    @classmethod
+    def from_compiled(cls, compiled):
+        """Build an in-memory FilterSet (used when the cache cannot be written)"""
+        tables = []
+        for key in ("block_rules", "allow_rules"):
+            buckets = {}
+            for _token, text in compiled[key]:
+                rule = FilterRule.parse(text)
+                if rule is not None:
+                    buckets.setdefault(rule.token, []).append(rule)
+            tables.append(buckets)
+        for key in ("hide", "hide_allow"):
+            by_domain = {}
+            for domain, selector in compiled[key]:
+                by_domain.setdefault(domain, []).append(selector)
+            tables.append(by_domain)
+        return cls(DomainSuffixIndex(compiled["block_hosts"]), DomainSuffixIndex(compiled["allow_hosts"]),
+                   tables[0], tables[1], compiled["rule_count"],
+                   tables[2], tables[3], compiled["generic_css"])
+    
+    @classmethod
+    def open_cache(cls, path, signature, native=False):
+        """Map a compiled cache file; returns None if missing, stale or unreadable"""
+        # ctypes can only hand out the address of a writable buffer; copy-on-write
+        # pages are still shared with the file as long as nothing writes to them
+        access = mmap.ACCESS_COPY if native else mmap.ACCESS_READ
+        try:
+            with open(path, "rb") as f:
+                buf = mmap.mmap(f.fileno(), 0, access=access)
+        except (OSError, ValueError):
+            return None
+        try:
+            if buf[:4] != _FILTER_CACHE_MAGIC or _U32.unpack_from(buf, 4)[0] != _FILTER_CACHE_VERSION:
+                raise ValueError("bad header")
+            header_len = _U32.unpack_from(buf, 8)[0]
+            header = json.loads(buf[12:12 + header_len].decode("utf-8"))
+            if header.get("signature") != signature:
+                raise ValueError("stale")
+            base = 12 + header_len
+            sections = header["sections"]
+            filters = cls(
+                _MappedHostTable(buf, base + sections["block_hosts"]),
+                _MappedHostTable(buf, base + sections["allow_hosts"]),
+                _MappedRuleTable(buf, base + sections["block_rules"]),
+                _MappedRuleTable(buf, base + sections["allow_rules"]),
+                header.get("rule_count", 0),
+                _MappedSelectorTable(buf, base + sections["hide"]),
+                _MappedSelectorTable(buf, base + sections["hide_allow"]),
+                buf[base + sections["generic_css"]:base + sections["generic_css_end"]].decode("utf-8"),
+            )
+        except Exception:
+            buf.close()
+            return None
+        filters._mapping = buf
+        if native:
+            filters.native = NativeFilterMatcher.attach(buf, [base + sections[name] for name in (
+                "block_hosts", "allow_hosts", "block_rules", "allow_rules")])
+        return filters
+
+
+def _filter_list_paths(filters_dir=FILTERS_DIR):
+    try:
+        names = sorted(os.listdir(filters_dir))
+    except OSError:
+        return []
+    return [os.path.join(filters_dir, n) for n in names if n.lower().endswith(".txt")]
+
+
+def _filter_signature(paths):
+    """Identifies the inputs of a compiled cache; any change forces a recompile"""
+    files = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        files.append([os.path.basename(path), st.st_size, st.st_mtime_ns])
+    builtin = zlib.crc32("\n".join(sorted(AD_DOMAINS)).encode())
+    return [_FILTER_CACHE_VERSION, builtin, files]
+
+
+def compile_filter_lists(paths):
+    """Parse filter-list files into the sorted tables stored in the cache"""
+    block_hosts = {d for d in AD_DOMAINS if "/" not in d}
+    allow_hosts = set()
+    block_rules = set()
+    allow_rules = set()
+    hide_generic = set()
+    hide = set()           # (domain, selector)
+    hide_allow = set()     # (domain, selector)
+    unhide_everywhere = set()
+    rule_count = len(block_hosts)
+    
+    for path in paths:
+        try:
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                for line in f:
+                    if "#" in line:
+                        cosmetic = _parse_cosmetic_rule(line)
+                        if cosmetic is not None:
+                            rule_count += 1
+                            include_domains, exclude_domains, is_exception, selector = cosmetic
+                            if is_exception:
+                                if not include_domains:
+                                    unhide_everywhere.add(selector)
+                                hide_allow.update((d, selector) for d in include_domains)
+                            else:
+                                if include_domains:
+                                    hide.update((d, selector) for d in include_domains)
+                                else:
+                                    hide_generic.add(selector)
+                                hide_allow.update((d, selector) for d in exclude_domains)
+                            continue
+                    rule = FilterRule.parse(line)
+                    if rule is None:
+                        continue
+                    rule_count += 1
+                    # Plain `||domain^` rules go to the host tables; the rest are bucketed by
+                    # token, so a URL only checks rules whose token it contains
+                    host_rule = None
+                    if rule.third_party is None and rule.type_mask == _DEFAULT_TYPE_MASK \
+                            and not rule.include_domains and not rule.exclude_domains:
+                        host_rule = _HOST_RULE_RE.match(rule.pattern)
+                    if host_rule:
+                        (allow_hosts if rule.is_exception else block_hosts).add(host_rule.group(1))
+                    else:
+                        (allow_rules if rule.is_exception else block_rules).add((rule.token, rule.text))
+        except OSError as e:
+            print(f"[AdBlock] Failed to read filter list {path}: {e}")
+    
+    # Hosts with path-level exceptions (`@@||host/path`) need the full URL
+    # check, so their whole-host block moves from the host table to the rules
+    exception_hosts = set()
+    for _token, text in allow_rules:
+        anchored = _EXCEPTION_HOST_RE.match(text.lower())
+        if anchored:
+            exception_hosts.add(anchored.group(1))
+    demoted = {h for h in block_hosts if _host_in_domains(h, exception_hosts)}
+    for host in exception_hosts:
+        while host:
+            if host in block_hosts:
+                demoted.add(host)
+            dot = host.find(".")
+            host = host[dot + 1:] if dot >= 0 else ""
+    for host in demoted:
+        block_hosts.discard(host)
+        rule = FilterRule.parse("||%s^" % host)
+        block_rules.add((rule.token, rule.text))
+    
+    # Generic selectors with per-domain exceptions cannot live in the shared
+    # stylesheet; they are resolved per site by FilterSet.site_css instead
+    excepted = {selector for _domain, selector in hide_allow}
+    hide.update((_CONDITIONAL_GENERIC, sel) for sel in hide_generic & excepted)
+    hide_generic -= excepted
+    hide_generic -= unhide_everywhere
+    hide = {(d, sel) for d, sel in hide if sel not in unhide_everywhere}
+    
+    return {
+        "block_hosts": sorted(block_hosts),
+        "allow_hosts": sorted(allow_hosts),
+        "block_rules": sorted(block_rules),
+        "allow_rules": sorted(allow_rules),
+        "hide": sorted(hide),
+        "hide_allow": sorted(hide_allow),
+        "generic_css": _hiding_css(hide_generic),
+        "rule_count": rule_count,
+    }
+
+
+def _pack_string_table(entries):
+    entries = sorted(entries)
+    offsets = [0]
+    for entry in entries:
+        offsets.append(offsets[-1] + len(entry))
+    return struct.pack("<%dI" % (len(offsets) + 1), len(entries), *offsets) + b"".join(entries)
+
+
+def _rule_entry(token, text):
+    """`token NUL native-fields NUL rule-text`; the fields are FilterRule's, pre-parsed for gbfilter.c"""
+    rule = FilterRule.parse(text)
+    party = "-" if rule.third_party is None else "3" if rule.third_party else "1"
+    fields = "\t".join((party, str(rule.type_mask), ",".join(sorted(rule.include_domains)),
+                        ",".join(sorted(rule.exclude_domains)), rule.pattern))
+    return (token + "\0" + fields + "\0" + text).encode()
+
+
+def write_filter_cache(path, signature, compiled):
+    """Write compiled tables as a mappable index (temp file + rename)"""
+    sections = {
+        "block_hosts": _pack_string_table(h.encode() for h in compiled["block_hosts"]),
+        "allow_hosts": _pack_string_table(h.encode() for h in compiled["allow_hosts"]),
+        "block_rules": _pack_string_table(_rule_entry(t, r) for t, r in compiled["block_rules"]),
+        "allow_rules": _pack_string_table(_rule_entry(t, r) for t, r in compiled["allow_rules"]),
+        "hide": _pack_string_table((d + "\0" + sel).encode() for d, sel in compiled["hide"]),
+        "hide_allow": _pack_string_table((d + "\0" + sel).encode() for d, sel in compiled["hide_allow"]),
+        "generic_css": compiled["generic_css"].encode(),
+    }
+    offsets = {}
+    pos = 0
+    for name, data in sections.items():
+        offsets[name] = pos
+        pos += len(data)
+    offsets["generic_css_end"] = pos
+    header = json.dumps({
+        "signature": signature,
+        "rule_count": compiled["rule_count"],
+        "sections": offsets,
+    }).encode("utf-8")
+    
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_FILTER_CACHE_MAGIC + _U32.pack(_FILTER_CACHE_VERSION) + _U32.pack(len(header)) + header)
+        for data in sections.values():
+            f.write(data)
+    os.replace(tmp_path, path)
+
+
+def load_filter_set(filters_dir=FILTERS_DIR, cache_file=FILTER_CACHE_FILE, native=False):
+    """Map the compiled filter cache, recompiling it first if any list changed"""
+    os.makedirs(filters_dir, exist_ok=True)
+    paths = _filter_list_paths(filters_dir)
+    signature = _filter_signature(paths)
+    
+    filters = FilterSet.open_cache(cache_file, signature, native)
+    if filters is not None:
+        return filters
+    
+    compiled = compile_filter_lists(paths)
+    try:
+        write_filter_cache(cache_file, signature, compiled)
+        filters = FilterSet.open_cache(cache_file, signature, native)
+    except OSError as e:
+        print(f"[AdBlock] Failed to write filter cache: {e}")
+    return filters or FilterSet.from_compiled(compiled)
+
+
+class AdBlockStats:
+    """Blocked/allowed counters and interceptRequest latency for AdBlocker"""
+    
+    # Latency histogram bucket upper bounds in microseconds (last bucket is open)
+    LATENCY_BUCKETS_US = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+    # Request hosts beyond MAX_DOMAINS are counted together under OTHER_DOMAINS
+    MAX_DOMAINS = 4096
+    OTHER_DOMAINS = "(other)"
+    
+    def __init__(self):
+        self.reset()
+    
+    def reset(self):
+        # Page id of the PageRequestInterceptor that saw the request (None for worker
+        # scripts, which belong to no page); dropped by forget_page when the page goes away
+        self.pages = {}    # page id -> [blocked, allowed]
+        self.domains = {}  # request host -> [blocked, allowed]
+        self.latency = [0] * (len(self.LATENCY_BUCKETS_US) + 1)
+        self.latency_total_ns = 0
+        self.requests = 0
+        self._bucket_bounds_ns = [b * 1000 for b in self.LATENCY_BUCKETS_US]
+    
+    def record(self, page_id, host, blocked, elapsed_ns):
+        slot = 0 if blocked else 1
+        counts = self.pages.get(page_id)
+        if counts is None:
+            counts = self.pages[page_id] = [0, 0]
+        counts[slot] += 1
+        counts = self.domains.get(host)
+        if counts is None:
+            if len(self.domains) >= self.MAX_DOMAINS:
+                host = self.OTHER_DOMAINS
+                counts = self.domains.get(host)
+            if counts is None:
+                counts = self.domains[host] = [0, 0]
+        counts[slot] += 1
+        self.latency[bisect_left(self._bucket_bounds_ns, elapsed_ns)] += 1
+        self.latency_total_ns += elapsed_ns
+        self.requests += 1
+    
+    def forget_page(self, page_id):
+        self.pages.pop(page_id, None)
+    
+    def to_dict(self, tabs=()):
+        """Snapshot as plain data; tabs is a list of (title, url, page id) for the open tabs"""
+        # dict() copies are atomic under the GIL while the IO thread keeps counting
+        pages = dict(self.pages)
+        domains = dict(self.domains)
+        labels = ["<=%dus" % b for b in self.LATENCY_BUCKETS_US]
+        labels.append(">%dus" % self.LATENCY_BUCKETS_US[-1])
+        
+        tab_stats = []
+        for title, url, page_id in tabs:
+            blocked, allowed = pages.get(page_id, (0, 0)) if page_id is not None else (0, 0)
+            tab_stats.append({"title": title, "url": url, "blocked": blocked, "allowed": allowed})
+        blocked, allowed = pages.get(None, (0, 0))
+        
+        return {
+            "requests": self.requests,
+            "mean_latency_us": round(self.latency_total_ns / self.requests / 1000, 2) if self.requests else 0,
+            "latency_histogram": dict(zip(labels, self.latency)),
+            "tabs": tab_stats,
+            "workers": {"blocked": blocked, "allowed": allowed},
+            "domains": {h: {"blocked": c[0], "allowed": c[1]} for h, c in sorted(domains.items())},
+        }
+
+
 class AdBlocker(QWebEngineUrlRequestInterceptor):
     """Request interceptor to block ads and trackers"""
     
-    def __init__(self, parent=None):
+    HOST_CACHE_SIZE = 4096
+    
+    # Emitted (queued to the GUI thread) when a new filter set is in place
+    filters_loaded = pyqtSignal()
+    
+    def __init__(self, parent=None, native=False):
         super().__init__(parent)
+        self.native = native
         self.blocked_count = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
         self.enabled = True
+        self.stats = AdBlockStats()
+        self.ad_hosts = DomainSuffixIndex(AD_DOMAINS)
+        self.url_patterns = UrlPatternMatcher(AD_URL_PATTERNS)
+        # Qt resource type -> ABP type bit; anything unmapped counts as "other"
+        self._type_bits = {}
+        for name, abp_type in QT_RESOURCE_TYPES.items():
+            member = getattr(QWebEngineUrlRequestInfo.ResourceType, name, None)
+            if member is not None:
+                self._type_bits[member] = RESOURCE_TYPE_BITS[abp_type]
+        self._worker_types = {getattr(QWebEngineUrlRequestInfo.ResourceType, name)
+                              for name in WORKER_RESOURCE_TYPES
+                              if hasattr(QWebEngineUrlRequestInfo.ResourceType, name)}
+        self._next_page_id = 1
+        # host -> host-level verdict, see FilterSet.host_verdict
+        self._host_cache = OrderedDict()
+        # Filter lists from FILTERS_DIR, swapped in by load_filters()
+        self.filters = None
+    
+    def load_filters(self):
+        """Map (or compile) the filter lists on a background thread"""
+        def worker():
+            try:
+                filters = load_filter_set(native=self.native)
+            except Exception as e:
+                print(f"[AdBlock] Failed to load filter lists: {e}")
+                return
+            self.filters = filters
+            self.clear_cache()
+            mode = "native" if filters.native is not None else "python"
+            print(f"[AdBlock] Loaded {filters.rule_count} filter rules ({mode} matching)")
+            self.filters_loaded.emit()
+        
+        threading.Thread(target=worker, daemon=True).start()
+    
+    def clear_cache(self):
+        """Drop cached decisions; call whenever the rule set changes"""
+        # Rebind rather than clear() so the IO thread never sees a half-emptied dict
+        self._host_cache = OrderedDict()
+    
+    def _host_verdict(self, host):
+        # FilterSet.host_verdict depends only on the host, so it is safe to cache per host
+        cache = self._host_cache
+        try:
+            verdict = cache[host]
+        except KeyError:
+            pass
+        else:
+            self.cache_hits += 1
+            cache.move_to_end(host)
+            return verdict
+        
+        self.cache_misses += 1
+        filters = self.filters
+        if filters is not None:
+            verdict = filters.host_verdict(host)
+        else:
+            # Lists still loading: built-in rules only
+            verdict = True if host in self.ad_hosts else None
+        cache[host] = verdict
+        if len(cache) > self.HOST_CACHE_SIZE:
+            cache.popitem(last=False)
+        return verdict
+    
+    def page_interceptor(self, page):
+        """Interceptor for one page's requests; its stats are dropped with the page"""
+        page_id, self._next_page_id = self._next_page_id, self._next_page_id + 1
+        page.destroyed.connect(lambda *_: self.stats.forget_page(page_id))
+        return PageRequestInterceptor(self, page_id, page)
     
     def interceptRequest(self, info):
+        # Page requests are filtered by each page's PageRequestInterceptor (a
+        # profile-level block would hide them from it); workers have no page
+        if info.resourceType() in self._worker_types:
+            self.filter_request(info, None)
+    
+    def filter_request(self, info, page_id):
         if not self.enabled:
             return
-            
-        url = info.requestUrl().toString().lower()
+        
+        start = time.perf_counter_ns()
         host = info.requestUrl().host().lower()
+        first_party_host = info.firstPartyUrl().host().lower()
+        type_bit = self._type_bits.get(info.resourceType(), RESOURCE_TYPE_BITS["other"])
         
-        # Check if host matches any ad domain
-        for ad_domain in AD_DOMAINS:
-            if host == ad_domain or host.endswith("." + ad_domain):
-                info.block(True)
-                self.blocked_count += 1
-                return
+        if type_bit == RESOURCE_TYPE_BITS["document"]:
+            # Top-level navigations are never blocked: skip every lookup
+            blocked = False
+        else:
+            blocked = self._host_verdict(host)
         
-        # Check URL patterns
-        for pattern in AD_URL_PATTERNS:
-            if re.search(pattern, url, re.IGNORECASE):
-                info.block(True)
-                self.blocked_count += 1
-                return
+        if blocked is None:
+            # Host tables had no opinion: scan the URL rules
+            url = info.requestUrl().toString().lower()
+            third_party = _is_third_party(host, first_party_host)
+            # Built-in URL patterns are broad, so only apply them cross-site
+            blocked = third_party and self.url_patterns.search(url)
+            filters = self.filters
+            if filters is not None:
+                blocked = filters.url_verdict(url, first_party_host, third_party, type_bit, blocked)
+        
+        if blocked:
+            info.block(True)
+            self.blocked_count += 1
+        self.stats.record(page_id, host, bool(blocked), time.perf_counter_ns() - start)
+    
+    def stats_snapshot(self, tabs=()):
+        data = self.stats.to_dict(tabs)
+        data["blocked_count"] = self.blocked_count
+        data["cache_hits"] = self.cache_hits
+        data["cache_misses"] = self.cache_misses
+        data["filter_rules"] = self.filters.rule_count if self.filters is not None else 0
+        return data
+
+
+class PageRequestInterceptor(QWebEngineUrlRequestInterceptor):
+    """Runs AdBlocker on one page's requests, so its stats can be kept per page"""
+    
+    def __init__(self, ad_blocker, page_id, parent=None):
+        super().__init__(parent)
+        self._ad_blocker = ad_blocker
+        self.page_id = page_id
+    
+    def interceptRequest(self, info):
+        self._ad_blocker.filter_request(info, self.page_id)
+
+
+# Element hiding: applied as a constructed stylesheet when the document is
+# created, so hidden ads are never laid out or painted
+HIDE_CSS_JS = """
+(function() {
+    var css = %s;
+    function inject() {
+        var style = document.createElement('style');
+        style.textContent = css;
+        (document.head || document.documentElement).appendChild(style);
+    }
+    try {
+        var sheet = new CSSStyleSheet();
+        sheet.replaceSync(css);
+        document.adoptedStyleSheets = document.adoptedStyleSheets.concat([sheet]);
+    } catch (e) {
+        if (document.documentElement) inject();
+        else document.addEventListener('DOMContentLoaded', inject);
+    }
+})();
+"""
+GENERIC_CSS_SCRIPT = "gbrowser-hide-generic"
+SITE_CSS_SCRIPT = "gbrowser-hide-site"
+
+def hide_css_script(name, css):
+    script = QWebEngineScript()
+    script.setName(name)
+    script.setSourceCode(HIDE_CSS_JS % json.dumps(css))
+    script.setInjectionPoint(QWebEngineScript.InjectionPoint.DocumentCreation)
+    script.setWorldId(QWebEngineScript.ScriptWorldId.ApplicationWorld)
+    script.setRunsOnSubFrames(True)
+    return script
 
 
 # Small SVG helpers
@@ -158,6 +1422,7 @@ NEW_TAB_SVG = '<svg width="20" height="20"><path d="M11 3H9v6H3v2h6v6h2v-6h6V9h-
 CLOSE_SVG = '<svg width="12" height="12"><path d="M2 2l8 8M10 2l-8 8" stroke="#ccc" stroke-width="2"/></svg>'
 
 def svg_icon(svg, size=20):
+    from PyQt6.QtSvg import QSvgRenderer  # first use is after the first paint
     r = QSvgRenderer(QByteArray(svg.encode()))
     pix = QPixmap(size, size)
     pix.fill(Qt.GlobalColor.transparent)
@@ -167,35 +1432,188 @@ def svg_icon(svg, size=20):
     return QIcon(pix)
 
 
+# QWebEngineSettings applied once to the profile; pages inherit them
+DEFAULT_WEB_ATTRIBUTES = {
+    "JavascriptEnabled": True,
+    "LocalStorageEnabled": True,
+    "WebGLEnabled": True,
+    "Accelerated2dCanvasEnabled": True,
+    "PluginsEnabled": True,
+    "FullScreenSupportEnabled": True,
+    "PlaybackRequiresUserGesture": False,
+    "JavascriptCanOpenWindows": True,
+    "LocalContentCanAccessRemoteUrls": True,
+    "AllowRunningInsecureContent": True,
+    "AllowGeolocationOnInsecureOrigins": True,
+    "ScrollAnimatorEnabled": True,
+    "AllowWindowActivationFromJavaScript": True,
+    "ErrorPageEnabled": False,
+    "FocusOnNavigationEnabled": True,
+    "HyperlinkAuditingEnabled": False,
+}
+
+# Renderer process model and memory budget, selected with "performance_profile"
+# in CONFIG_FILE or --perf-profile. "flags" must reach Chromium before the
+# QApplication exists; "page" overrides DEFAULT_WEB_ATTRIBUTES; a disk cache
+# of 0 lets QtWebEngine size it. "balanced" is the stock setup; the others are opt-in.
+PERFORMANCE_PROFILES = {
+    "low-memory": {
+        "flags": ["--process-per-site", "--renderer-process-limit=2",
+                  "--js-flags=--max-old-space-size=256"],
+        "disk_cache_mb": 64,
+        "spare_tabs": 0,
+        "page": {"WebGLEnabled": False, "Accelerated2dCanvasEnabled": False,
+                 "PluginsEnabled": False, "ScrollAnimatorEnabled": False},
+    },
+    "balanced": {
+        "flags": [],
+        "disk_cache_mb": 0,
+        "spare_tabs": 1,
+        "page": {},
+    },
+    "throughput": {
+        "flags": [],
+        "disk_cache_mb": 1024,
+        "spare_tabs": 2,
+        "page": {},
+    },
+}
+DEFAULT_PERFORMANCE_PROFILE = "balanced"
+
+
+def configured_performance_profile(config_file=CONFIG_FILE):
+    """Profile name saved in the config, read before Qt (and ConfigStore) can run"""
+    for path in (config_file, config_file + ".bak"):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                name = json.load(f).get("performance_profile")
+        except Exception:
+            continue
+        if name in PERFORMANCE_PROFILES:
+            return name
+        break
+    return DEFAULT_PERFORMANCE_PROFILE
+
+
+def apply_chromium_flags(name):
+    """Export the profile's Chromium flags; has no effect once QApplication is created"""
+    flags = PERFORMANCE_PROFILES[name]["flags"]
+    existing = os.environ.get("QTWEBENGINE_CHROMIUM_FLAGS", "").split()
+    # Flags the user exported themselves win over the profile's
+    given = {flag.split("=", 1)[0] for flag in existing}
+    merged = existing + [flag for flag in flags if flag.split("=", 1)[0] not in given]
+    if merged:
+        os.environ["QTWEBENGINE_CHROMIUM_FLAGS"] = " ".join(merged)
+    print(f"[Performance] Profile '{name}': {' '.join(flags) or 'Chromium defaults'}")
+
+
+class SiteSettings:
+    """Per-site overrides from config "site_settings", looked up on main-frame navigation"""
+    
+    POLICIES = ("allow", "deny", "ask")
+    
+    def __init__(self, table=None):
+        # Entries hold "attributes" (WebAttribute names -> bool, e.g. {"WebGLEnabled": false})
+        # and "permissions" (Feature names -> one of POLICIES; unlisted features are granted)
+        self.table = {}
+        for key, entry in (table or {}).items():
+            if not isinstance(entry, dict):
+                continue
+            attributes = {}
+            for name, value in (entry.get("attributes") or {}).items():
+                attr = getattr(QWebEngineSettings.WebAttribute, name, None)
+                if attr is None:
+                    print(f"[Sites] Unknown attribute {name} for {key}")
+                    continue
+                attributes[attr] = bool(value)
+            permissions = {name: policy for name, policy in (entry.get("permissions") or {}).items()
+                           if policy in self.POLICIES}
+            self.table[key.lower().rstrip("/")] = (attributes, permissions)
+        self._cache = {}  # origin -> merged (attributes, permissions)
+    
+    @staticmethod
+    def origin(url):
+        scheme, host, port = url.scheme().lower(), url.host().lower(), url.port()
+        return f"{scheme}://{host}" if port == -1 else f"{scheme}://{host}:{port}"
+    
+    def lookup(self, url):
+        """(attributes, permissions) for url's origin"""
+        if not self.table:
+            return {}, {}
+        origin = self.origin(url)
+        merged = self._cache.get(origin)
+        if merged is None:
+            # "*", then bare domains (which cover every scheme and subdomain), then the
+            # origin ("https://maps.example.com"): more specific keys win
+            labels = url.host().lower().split(".")
+            keys = ["*"] + [".".join(labels[i:]) for i in range(len(labels) - 1, -1, -1)] + [origin]
+            attributes, permissions = {}, {}
+            for key in keys:
+                entry = self.table.get(key)
+                if entry:
+                    attributes.update(entry[0])
+                    permissions.update(entry[1])
+            merged = self._cache[origin] = (attributes, permissions)
+        return merged
+    
+    def permission(self, url, feature):
+        return self.lookup(url)[1].get(getattr(feature, "name", str(feature)), "allow")
+
+
 class CustomWebPage(QWebEnginePage):
     def __init__(self, profile, parent=None, browser=None):
         super().__init__(profile, parent)
         self._browser = browser
-        
-        settings = self.settings()
-        settings.setAttribute(QWebEngineSettings.WebAttribute.JavascriptEnabled, True)
-        settings.setAttribute(QWebEngineSettings.WebAttribute.LocalStorageEnabled, True)
-        settings.setAttribute(QWebEngineSettings.WebAttribute.WebGLEnabled, True)
-        settings.setAttribute(QWebEngineSettings.WebAttribute.Accelerated2dCanvasEnabled, True)
-        settings.setAttribute(QWebEngineSettings.WebAttribute.PluginsEnabled, True)
-        settings.setAttribute(QWebEngineSettings.WebAttribute.FullScreenSupportEnabled, True)
-        settings.setAttribute(QWebEngineSettings.WebAttribute.PlaybackRequiresUserGesture, False)
-        settings.setAttribute(QWebEngineSettings.WebAttribute.JavascriptCanOpenWindows, True)
-        settings.setAttribute(QWebEngineSettings.WebAttribute.LocalContentCanAccessRemoteUrls, True)
-        settings.setAttribute(QWebEngineSettings.WebAttribute.AllowRunningInsecureContent, True)
-        settings.setAttribute(QWebEngineSettings.WebAttribute.AllowGeolocationOnInsecureOrigins, True)
-        settings.setAttribute(QWebEngineSettings.WebAttribute.ScrollAnimatorEnabled, True)
-        settings.setAttribute(QWebEngineSettings.WebAttribute.AllowWindowActivationFromJavaScript, True)
-        settings.setAttribute(QWebEngineSettings.WebAttribute.ErrorPageEnabled, False)
-        settings.setAttribute(QWebEngineSettings.WebAttribute.FocusOnNavigationEnabled, True)
-        settings.setAttribute(QWebEngineSettings.WebAttribute.HyperlinkAuditingEnabled, False)
+        self._site_css = ""
+        self._site_attributes = {}  # SiteSettings overrides set on this page; the rest come from the profile
+        self.ad_page_id = None
+        if browser:
+            interceptor = browser.ad_blocker.page_interceptor(self)
+            self.ad_page_id = interceptor.page_id
+            self.setUrlRequestInterceptor(interceptor)
         
         self.featurePermissionRequested.connect(self._handle_permission_request)
     
     def _handle_permission_request(self, url, feature):
-        self.setFeaturePermission(url, feature, QWebEnginePage.PermissionPolicy.PermissionGrantedByUser)
+        policy = self._browser.site_settings.permission(url, feature) if self._browser else "allow"
+        if policy == "ask":
+            answer = QMessageBox.question(
+                self._browser, "Permission Request",
+                f"Allow {SiteSettings.origin(url)} to use {getattr(feature, 'name', feature)}?")
+            policy = "allow" if answer == QMessageBox.StandardButton.Yes else "deny"
+        if policy == "allow":
+            self.setFeaturePermission(url, feature, QWebEnginePage.PermissionPolicy.PermissionGrantedByUser)
+        else:
+            self.setFeaturePermission(url, feature, QWebEnginePage.PermissionPolicy.PermissionDeniedByUser)
+    
+    def set_site_attributes(self, attributes):
+        """Swap this page's per-site settings overrides"""
+        if attributes == self._site_attributes:
+            return
+        settings = self.settings()
+        for attr in self._site_attributes:
+            if attr not in attributes:
+                settings.resetAttribute(attr)  # back to the profile's value
+        for attr, value in attributes.items():
+            settings.setAttribute(attr, value)
+        self._site_attributes = attributes
+    
+    def set_site_css(self, css):
+        """Swap this page's site-specific hiding stylesheet (applies from the next document)"""
+        if css == self._site_css:
+            return
+        scripts = self.scripts()
+        for script in scripts.find(SITE_CSS_SCRIPT):
+            scripts.remove(script)
+        if css:
+            scripts.insert(hide_css_script(SITE_CSS_SCRIPT, css))
+        self._site_css = css
     
     def acceptNavigationRequest(self, url, nav_type, is_main_frame):
+        if is_main_frame and self._browser:
+            # Runs before the new document exists, so its DocumentCreation sees the right CSS
+            self._browser.apply_site_css(self, url)
+            self.set_site_attributes(self._browser.site_settings.lookup(url)[0])
         return True
     
     def createWindow(self, window_type):
@@ -208,6 +1626,9 @@ class BrowserTab(QWebEngineView):
     def __init__(self, profile, browser, url=None):
         super().__init__()
         self._browser = browser
+        self.requested_url = url or ""  # until the first navigation commits, url() is empty
+        self.restore_scroll = None  # scroll position to put back after a discarded tab reloads
+        self._clear_history = False  # drop the about:blank entry a pooled tab starts with
         page = CustomWebPage(profile, self, browser)
         self.setPage(page)
         
@@ -217,9 +1638,26 @@ class BrowserTab(QWebEngineView):
         if url:
             self.setUrl(QUrl(url))
     
+    def reuse(self, url):
+        """Give a pooled about:blank tab its first real URL"""
+        self.requested_url = url or ""
+        self._clear_history = True
+        if url:
+            self.setUrl(QUrl(url))
+    
     def _on_load_finished(self, ok):
         if not ok or not self._browser:
             return
+        if not self.requested_url and self.url().toString() == "about:blank":
+            return  # a TabPool spare: nobody sees it, so skip the credential work
+        
+        if self._clear_history:
+            self._clear_history = False
+            self.history().clear()
+        
+        if self.restore_scroll is not None:
+            pos, self.restore_scroll = self.restore_scroll, None
+            self.page().runJavaScript(f"window.scrollTo({pos.x()}, {pos.y()});")
         
         url = self.url().toString().lower()
         domain = self._browser.credentials_manager.get_domain_from_url(url)
@@ -316,83 +1754,1152 @@ class BrowserTab(QWebEngineView):
             """
             self.page().runJavaScript(fill_script)
     
-    def _inject_standard_credentials(self, creds):
-        """Standard credential injection for regular websites."""
-        capture_script = """
-        (function() {
-            if (window._gbrowserCredCapture) return;
-            window._gbrowserCredCapture = true;
-            
-            document.addEventListener('submit', function(e) {
-                try {
-                    var form = e.target;
-                    if (form.tagName !== 'FORM') return;
-                    var pass = form.querySelector('input[type="password"]');
-                    if (!pass || !pass.value) return;
-                    var user = form.querySelector('input[type="email"], input[type="text"]');
-                    if (user && user.value) {
-                        window._gbrowserCreds = {username: user.value, password: pass.value};
-                    }
-                } catch(e) {}
-            }, true);
-        })();
-        """
-        self.page().runJavaScript(capture_script)
+    def _inject_standard_credentials(self, creds):
+        """Standard credential injection for regular websites."""
+        capture_script = """
+        (function() {
+            if (window._gbrowserCredCapture) return;
+            window._gbrowserCredCapture = true;
+            
+            document.addEventListener('submit', function(e) {
+                try {
+                    var form = e.target;
+                    if (form.tagName !== 'FORM') return;
+                    var pass = form.querySelector('input[type="password"]');
+                    if (!pass || !pass.value) return;
+                    var user = form.querySelector('input[type="email"], input[type="text"]');
+                    if (user && user.value) {
+                        window._gbrowserCreds = {username: user.value, password: pass.value};
+                    }
+                } catch(e) {}
+            }, true);
+        })();
+        """
+        self.page().runJavaScript(capture_script)
+        
+        # Schedule credential check
+        if self._cred_check_timer:
+            self._cred_check_timer.stop()
+        self._cred_check_timer = QTimer()
+        self._cred_check_timer.setSingleShot(True)
+        self._cred_check_timer.timeout.connect(lambda: self._check_and_save_credentials())
+        self._cred_check_timer.start(2000)
+        
+        # Auto-fill if we have credentials
+        if creds:
+            username = creds["username"].replace("\\", "\\\\").replace("'", "\\'").replace("\n", "")
+            password = creds["password"].replace("\\", "\\\\").replace("'", "\\'").replace("\n", "")
+            
+            fill_script = f"""
+            (function() {{
+                try {{
+                    var pass = document.querySelector('input[type="password"]');
+                    if (!pass) return;
+                    var user = document.querySelector('input[type="email"], input[type="text"]');
+                    if (user) {{
+                        user.value = '{username}';
+                        user.dispatchEvent(new Event('input', {{bubbles: true}}));
+                    }}
+                    pass.value = '{password}';
+                    pass.dispatchEvent(new Event('input', {{bubbles: true}}));
+                }} catch(e) {{}}
+            }})();
+            """
+            self.page().runJavaScript(fill_script)
+    
+    def _check_and_save_credentials(self):
+        if not self._browser:
+            return
+        
+        def handle_result(result):
+            if result and isinstance(result, dict):
+                username = result.get("username", "")
+                password = result.get("password", "")
+                if username and password:
+                    domain = self._browser.credentials_manager.get_domain_from_url(self.url().toString())
+                    self._browser.credentials_manager.save_credentials(domain, username, password)
+        
+        self.page().runJavaScript("window._gbrowserCreds || null", handle_result)
+
+
+class TabPlaceholder(QWidget):
+    """Stand-in for a tab whose view hasn't been created yet; swapped for a BrowserTab when selected"""
+    
+    def __init__(self, url, title=""):
+        super().__init__()
+        self.restore_url = url
+        self.restore_title = title
+    
+    def url(self):
+        return QUrl(self.restore_url)
+    
+    def title(self):
+        return self.restore_title
+
+
+def process_rss(pid):
+    """Resident memory of a process in bytes, or None where it can't be measured"""
+    try:
+        if sys.platform.startswith("linux"):
+            with open(f"/proc/{pid}/statm", "r") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        if sys.platform == "win32":
+            from ctypes import wintypes
+            
+            class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+                _fields_ = [
+                    ("cb", wintypes.DWORD),
+                    ("PageFaultCount", wintypes.DWORD),
+                    ("PeakWorkingSetSize", ctypes.c_size_t),
+                    ("WorkingSetSize", ctypes.c_size_t),
+                    ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                    ("PagefileUsage", ctypes.c_size_t),
+                    ("PeakPagefileUsage", ctypes.c_size_t),
+                ]
+            
+            kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+            psapi = ctypes.WinDLL('psapi')
+            kernel32.OpenProcess.restype = wintypes.HANDLE
+            handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+            if not handle:
+                return None
+            try:
+                counters = PROCESS_MEMORY_COUNTERS()
+                counters.cb = ctypes.sizeof(counters)
+                if psapi.GetProcessMemoryInfo(wintypes.HANDLE(handle), ctypes.byref(counters), counters.cb):
+                    return counters.WorkingSetSize
+            finally:
+                kernel32.CloseHandle(wintypes.HANDLE(handle))
+    except Exception:
+        pass
+    return None
+
+
+PAUSE_MEDIA_JS = "document.querySelectorAll('video, audio').forEach(function (m) { m.pause(); });"
+
+
+class TabLifecycleManager:
+    """Mutes, freezes and discards background tabs, driven by tab switches in Browser"""
+    
+    # Memory check: over memory_budget_mb (browser plus renderers) or max_live_tabs, background
+    # tabs are discarded longest-hidden first; the view keeps its URL, title and history
+    CHECK_INTERVAL_MS = 30000
+    # Tabs hidden for freeze_after seconds get their media paused and LifecycleState.Frozen
+    FREEZE_CHECK_MS = 5000
+    # Never discard a tab hidden for less than this, or one that is playing audio
+    MIN_IDLE_SECONDS = 60
+    
+    def __init__(self, browser, memory_budget_mb=2048, max_live_tabs=0, enabled=True, freeze_after=120):
+        self._browser = browser
+        self.memory_budget = memory_budget_mb * 1024 * 1024
+        self.max_live_tabs = max_live_tabs
+        self.freeze_after = freeze_after  # seconds; 0 disables freezing and muting
+        self.hidden_since = {}  # background tab -> time.monotonic() when it was hidden
+        self.discarded_count = 0
+        self.under_pressure = False  # last check was over budget; TabPool holds off refilling
+        self._current = None
+        self._muted = set()  # tabs we muted (and so may unmute)
+        self._timer = QTimer()
+        self._timer.timeout.connect(self.check)
+        if enabled:
+            self._timer.start(self.CHECK_INTERVAL_MS)
+        self._freeze_timer = QTimer()
+        self._freeze_timer.timeout.connect(self.freeze_idle)
+        if freeze_after > 0:
+            self._freeze_timer.start(self.FREEZE_CHECK_MS)
+    
+    def _tabs(self):
+        tabs = self._browser.tabs
+        return [w for w in (tabs.widget(i) for i in range(tabs.count())) if isinstance(w, BrowserTab)]
+    
+    @staticmethod
+    def is_discarded(tab):
+        return tab.page().lifecycleState() == QWebEnginePage.LifecycleState.Discarded
+    
+    def activated(self, tab):
+        """Tab became current: mark it used, wake it up and hide the previous one"""
+        previous, self._current = self._current, tab
+        if previous is not None and previous is not tab:
+            self._hidden(previous)
+        if not isinstance(tab, BrowserTab):
+            return
+        self.hidden_since.pop(tab, None)
+        page = tab.page()
+        if page.lifecycleState() != QWebEnginePage.LifecycleState.Active:
+            page.setLifecycleState(QWebEnginePage.LifecycleState.Active)
+        if tab in self._muted:
+            self._muted.discard(tab)
+            page.setAudioMuted(False)
+    
+    def _hidden(self, tab):
+        if not isinstance(tab, BrowserTab):
+            return
+        self.hidden_since[tab] = time.monotonic()
+        if self.freeze_after <= 0:
+            return
+        page = tab.page()
+        # Keep what the user was listening to; silence anything that starts later
+        if not page.recentlyAudible() and not page.isAudioMuted():
+            page.setAudioMuted(True)
+            self._muted.add(tab)
+    
+    def forget(self, tab):
+        self.hidden_since.pop(tab, None)
+        self._muted.discard(tab)
+        if self._current is tab:
+            self._current = None
+    
+    def _audible(self, tab):
+        """Playing audio the user can hear (not just audio we muted)"""
+        return tab.page().recentlyAudible() and tab not in self._muted
+    
+    def freeze_idle(self):
+        """Freeze tabs that have been in the background for freeze_after seconds"""
+        now = time.monotonic()
+        for tab, since in list(self.hidden_since.items()):
+            if now - since >= self.freeze_after and tab is not self._current and not self._audible(tab):
+                if tab.page().lifecycleState() == QWebEnginePage.LifecycleState.Active:
+                    self.freeze(tab)
+    
+    def freeze(self, tab):
+        page = tab.page()
+        
+        def on_paused(_result, t=tab):
+            # The tab may have been activated or closed while the script ran
+            if t is not self._current and t in self.hidden_since and not self._audible(t):
+                if t.page().lifecycleState() == QWebEnginePage.LifecycleState.Active:
+                    t.page().setLifecycleState(QWebEnginePage.LifecycleState.Frozen)
+        
+        page.runJavaScript(PAUSE_MEDIA_JS, on_paused)
+    
+    def renderer_usage(self, tabs):
+        """{renderer pid: resident bytes} for the given tabs' live renderers"""
+        usage = {}
+        for tab in tabs:
+            pid = tab.page().renderProcessPid()
+            if pid > 0 and pid not in usage:
+                usage[pid] = process_rss(pid)
+        return usage
+    
+    def check(self):
+        current = self._browser._current_browser()
+        live = [tab for tab in self._tabs() if not self.is_discarded(tab)]
+        renderers = self.renderer_usage(live + self._browser.tab_pool.spares)
+        own = process_rss(os.getpid())
+        usage = None
+        if own is not None and None not in renderers.values():
+            usage = own + sum(renderers.values())
+        
+        excess_tabs = len(live) - self.max_live_tabs if self.max_live_tabs > 0 else 0
+        excess_memory = usage - self.memory_budget if usage is not None else 0
+        was_under_pressure, self.under_pressure = self.under_pressure, excess_memory > 0
+        if was_under_pressure and not self.under_pressure:
+            self._browser.tab_pool.schedule_refill()
+        if self.under_pressure:
+            # Spare tabs are the cheapest memory to give back
+            for tab in self._browser.tab_pool.spares:
+                pid = tab.page().renderProcessPid()
+                excess_memory -= renderers.pop(pid, None) or 0
+            self._browser.tab_pool.drain()
+        if excess_tabs <= 0 and excess_memory <= 0:
+            return
+        
+        now = time.monotonic()
+        for tab in live:
+            if tab is not current:
+                # Background tabs we never saw hidden (e.g. opened behind the current one) start now
+                self.hidden_since.setdefault(tab, now)
+        candidates = [tab for tab in live
+                      if tab is not current
+                      and now - self.hidden_since[tab] >= self.MIN_IDLE_SECONDS
+                      and not tab.page().recentlyAudible()]
+        candidates.sort(key=lambda tab: self.hidden_since[tab])
+        
+        # Tabs sharing a renderer each get an equal share of its memory
+        sharing = {}
+        for tab in live:
+            pid = tab.page().renderProcessPid()
+            sharing[pid] = sharing.get(pid, 0) + 1
+        for tab in candidates:
+            if excess_tabs <= 0 and excess_memory <= 0:
+                break
+            pid = tab.page().renderProcessPid()
+            excess_memory -= (renderers.get(pid) or 0) // max(sharing.get(pid, 1), 1)
+            excess_tabs -= 1
+            self.discard(tab)
+    
+    def discard(self, tab):
+        page = tab.page()
+        tab.restore_scroll = page.scrollPosition()
+        if page.lifecycleState() == QWebEnginePage.LifecycleState.Active:
+            page.setLifecycleState(QWebEnginePage.LifecycleState.Frozen)
+        page.setLifecycleState(QWebEnginePage.LifecycleState.Discarded)
+        self.discarded_count += 1
+        print(f"[Tabs] Discarded background tab {tab.url().toString()}")
+
+
+class TabPool:
+    """Spare about:blank BrowserTabs, so a new tab skips creating its view, page and renderer"""
+    
+    # One spare is created per tick while idle; spares are handed out only once their
+    # about:blank load has finished, and the pool is emptied while TabLifecycleManager is over budget
+    REFILL_DELAY_MS = 1000
+    
+    def __init__(self, browser, size=1):
+        self._browser = browser
+        self.size = max(0, int(size))
+        self.spares = []
+        self._ready = set()
+        self._hooks = {}  # spare -> its loadFinished connection
+        self._timer = QTimer()
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(self.REFILL_DELAY_MS)
+        self._timer.timeout.connect(self._refill)
+    
+    def take(self):
+        """A warm tab, or None if none is ready"""
+        tab = next((t for t in self.spares if t in self._ready), None)
+        if tab is not None:
+            self.spares.remove(tab)
+            self._ready.discard(tab)
+            tab.loadFinished.disconnect(self._hooks.pop(tab))
+        self.schedule_refill()
+        return tab
+    
+    def schedule_refill(self):
+        if len(self.spares) < self.size and not self._timer.isActive():
+            self._timer.start()
+    
+    def _refill(self):
+        if len(self.spares) >= self.size or self._browser.tab_lifecycle.under_pressure:
+            return
+        tab = BrowserTab(self._browser.profile, self._browser)
+        self._hooks[tab] = tab.loadFinished.connect(lambda ok, t=tab: self._ready.add(t))
+        tab.setUrl(QUrl("about:blank"))
+        self.spares.append(tab)
+        self.schedule_refill()
+    
+    def drain(self):
+        """Release every spare and its renderer"""
+        if self.spares:
+            print(f"[Tabs] Released {len(self.spares)} spare tabs")
+        for tab in self.spares:
+            tab.deleteLater()
+        self.spares = []
+        self._ready.clear()
+        self._hooks.clear()
+
+
+class ConfigStore:
+    """CONFIG_FILE persistence: debounced, atomic saves written on a background thread"""
+    
+    # save() only (re)starts the timer, so a burst of changes becomes one write
+    SAVE_DELAY_MS = 1500
+    # Cap on how long a stream of changes (e.g. a title ticking every second) can postpone the write
+    MAX_SAVE_DELAY_MS = 5000
+    
+    def __init__(self, path, collect=None):
+        self.path = path
+        self.backup_path = path + ".bak"
+        self.collect = collect  # called on the GUI thread right before each snapshot
+        self._keep_backup = True  # False while the main file is unreadable (don't rotate it into .bak)
+        self.data = self.load()
+        self._dirty_since = None  # monotonic time of the oldest unsaved change
+        self._timer = QTimer()
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self.flush)
+        self._cond = threading.Condition()
+        self._pending = None  # newest snapshot not yet written
+        self._writing = False
+        self._thread = None
+    
+    def load(self):
+        # Fall back to the .bak when the main file is missing or unreadable
+        for path in (self.path, self.backup_path):
+            if not os.path.exists(path):
+                continue
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if isinstance(data, dict):
+                    if path == self.backup_path:
+                        print(f"[Config] Restored settings from backup {path}")
+                    return data
+            except Exception as e:
+                print(f"[Config] Could not read {path}: {e}")
+            if path == self.path:
+                self._keep_backup = False
+        return {}
+    
+    def save(self):
+        """Schedule a save; calls within SAVE_DELAY_MS of each other collapse into one write"""
+        now = time.monotonic()
+        if self._dirty_since is None:
+            self._dirty_since = now
+        waited_ms = int((now - self._dirty_since) * 1000)
+        self._timer.start(max(0, min(self.SAVE_DELAY_MS, self.MAX_SAVE_DELAY_MS - waited_ms)))
+    
+    def flush(self, wait=False):
+        """Snapshot the config now and queue it for writing; wait=True blocks until it is on disk"""
+        self._timer.stop()
+        self._dirty_since = None
+        if self.collect is not None:
+            self.collect()
+        try:
+            text = json.dumps(self.data, indent=2)
+        except Exception as e:
+            print(f"[Config] Failed to serialize config: {e}")
+            return
+        with self._cond:
+            # An older snapshot that is still queued is simply replaced
+            self._pending = text
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+            if wait:
+                while self._pending is not None or self._writing:
+                    self._cond.wait()
+    
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._pending is None:
+                    self._cond.wait()
+                text, self._pending = self._pending, None
+                self._writing = True
+            try:
+                self._write(text)
+            except Exception as e:
+                print(f"[Config] Failed to save config: {e}")
+            finally:
+                with self._cond:
+                    self._writing = False
+                    self._cond.notify_all()
+    
+    def _write(self, text):
+        # Temp file, fsync, previous file to .bak, then rename into place
+        directory = os.path.dirname(self.path)
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        if self._keep_backup and os.path.exists(self.path):
+            os.replace(self.path, self.backup_path)
+        os.replace(tmp_path, self.path)
+        self._keep_backup = True
+        if os.name != "nt":
+            # Make the renames themselves durable (directories can't be fsynced on Windows)
+            fd = os.open(directory, os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+
+class BookmarksHTMLParser(HTMLParser):
+    """Single-pass parser for Netscape-style bookmarks HTML (browser exports)"""
+    
+    FOLDER_TAGS = ("h3", "h1", "h2")
+    
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.roots = []
+        self.links = []
+        self.saw_dl = False
+        self._stack = []            # children lists of the open <dl>s
+        self._pending_folder = None  # folder whose <dl> may come next
+        self._capture = None        # "folder" or ("link", href) while collecting text
+        self._text = []
+        # Fully parsed nodes of the level result() will return, for callers feeding chunks.
+        # That level is a lone top-level folder's children (the usual export wrapper) until
+        # a second top-level node shows up; streaming then restarts at the top level.
+        self.completed = []
+        self.restarted = False
+        self._wrapper = None        # lone top-level folder whose children are streamed
+        self._open_node = None      # streamed folder whose children may still be coming
+    
+    def _streamed(self):
+        return self._wrapper["children"] if self._wrapper is not None else self.roots
+    
+    def _flush_open(self):
+        if self._open_node is not None:
+            self.completed.append(self._open_node)
+            self._open_node = None
+    
+    def _added(self, siblings, node):
+        if siblings is self.roots:
+            if self._wrapper is None and len(self.roots) == 1 and node["type"] == "folder":
+                self._wrapper = node
+                return
+            if self._wrapper is not None:
+                # A second top-level node: the first folder was not a wrapper after all
+                self._wrapper = None
+                self._open_node = None
+                self.completed = self.roots[:-1]
+                self.restarted = True
+        if siblings is self._streamed():
+            self._flush_open()
+            if node["type"] == "folder":
+                self._open_node = node
+            else:
+                self.completed.append(node)
+    
+    def take_completed(self):
+        """Streamed nodes finished since the last call"""
+        completed, self.completed = self.completed, []
+        return completed
+    
+    def _current(self):
+        return self._stack[-1] if self._stack else None
+    
+    def _finish_capture(self):
+        capture, self._capture = self._capture, None
+        if capture is None:
+            return
+        title = "".join(self._text).strip()
+        siblings = self._current()
+        if capture == "folder":
+            node = {"type": "folder", "title": title or "Folder", "children": []}
+            if siblings is not None:
+                siblings.append(node)
+                self._pending_folder = node
+                self._added(siblings, node)
+            return
+        href = capture[1]
+        if href:
+            node = {"type": "link", "title": title or href, "href": href}
+            self.links.append(node)
+            if siblings is not None:
+                siblings.append(node)
+                self._added(siblings, node)
+    
+    def handle_starttag(self, tag, attrs):
+        # A folder's <h3> is followed by the <dl> holding its children; links are <a> tags
+        if tag == "dl":
+            self._finish_capture()
+            if not self._stack:
+                # Only the first top-level list counts; later ones are parsed and dropped
+                self._stack.append(self.roots if not self.saw_dl else [])
+                self.saw_dl = True
+            elif self._pending_folder is not None:
+                self._stack.append(self._pending_folder["children"])
+            else:
+                self._stack.append([])
+            self._pending_folder = None
+        elif tag in self.FOLDER_TAGS:
+            self._finish_capture()
+            self._pending_folder = None
+            self._capture = "folder"
+            self._text = []
+        elif tag == "a":
+            self._finish_capture()
+            self._pending_folder = None
+            self._capture = ("link", dict(attrs).get("href"))
+            self._text = []
+        elif tag == "dt":
+            self._finish_capture()
+            self._pending_folder = None
+            if self._current() is self._streamed():
+                self._flush_open()
+    
+    def handle_endtag(self, tag):
+        if tag == "dl":
+            self._finish_capture()
+            self._pending_folder = None
+            if self._stack:
+                if self._stack.pop() is self._streamed():
+                    self._flush_open()
+        elif tag == "a" or tag in self.FOLDER_TAGS:
+            self._finish_capture()
+    
+    def handle_data(self, data):
+        if self._capture is not None:
+            self._text.append(data)
+    
+    def result(self):
+        """Top-level nodes; a single wrapping folder is unwrapped"""
+        self._finish_capture()
+        self._flush_open()
+        if not self.saw_dl:
+            return list(self.links)
+        if len(self.roots) == 1 and self.roots[0].get("type") == "folder":
+            return self.roots[0].get("children", self.roots)
+        return self.roots
+
+
+def parse_bookmarks_html(html):
+    parser = BookmarksHTMLParser()
+    parser.feed(html)
+    parser.close()
+    return parser.result()
+
+
+class BookmarkIndex:
+    """Lookup tables over the bookmark tree keyed by stable node ids"""
+    
+    def __init__(self, roots=None):
+        self.nodes = {}     # id -> node
+        self.by_title = {}  # title -> [id, ...] (links only)
+        self.by_url = {}    # href -> [id, ...]
+        self._next_id = 1
+        if roots:
+            self.add(roots)
+    
+    def rebuild(self, roots):
+        self.nodes.clear()
+        self.by_title.clear()
+        self.by_url.clear()
+        self.add(roots)
+    
+    def add(self, roots):
+        """Index roots and everything below them (iteratively, in tree order); returns the new nodes"""
+        added = []
+        unnumbered = []
+        stack = list(reversed(roots))
+        while stack:
+            node = stack.pop()
+            node_id = node.get("id")
+            if isinstance(node_id, int) and node_id > 0 and node_id not in self.nodes:
+                self._register(node_id, node)
+                self._next_id = max(self._next_id, node_id + 1)
+            else:
+                unnumbered.append(node)
+            added.append(node)
+            # Stored folders that were never opened are indexed when they load
+            if node.get("type") == "folder" and getattr(node, "loaded", True):
+                stack.extend(reversed(node.get("children", [])))
+        # Ids live in the nodes, so they survive saving and reloading; fresh imports
+        # are numbered after the highest id already in use
+        for node in unnumbered:
+            node["id"] = self._next_id
+            self._next_id += 1
+            self._register(node["id"], node)
+        return added
+    
+    def _register(self, node_id, node):
+        self.nodes[node_id] = node
+        if node.get("type") == "link":
+            self.by_title.setdefault(node.get("title"), []).append(node_id)
+            self.by_url.setdefault(node.get("href"), []).append(node_id)
+    
+    def reserve(self, max_id):
+        """Never hand out ids up to max_id (e.g. ids already used on disk)"""
+        self._next_id = max(self._next_id, max_id + 1)
+    
+    def get(self, node_id):
+        return self.nodes.get(node_id)
+    
+    def find_by_title(self, title):
+        return [self.nodes[i] for i in self.by_title.get(title, ())]
+    
+    def find_by_url(self, href):
+        return [self.nodes[i] for i in self.by_url.get(href, ())]
+
+
+_SEARCH_TOKEN_RE = re.compile(r"\w+")
+
+
+class BookmarkSearchIndex:
+    """Token inverted index over bookmark titles and URLs, used by the quick-open palette"""
+    
+    TITLE_WEIGHT = 2
+    URL_WEIGHT = 1
+    URL_NOISE = frozenset(("http", "https", "www"))
+    PRERANK_MIN = 64  # shorter postings are ranked on first use
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings = {}  # token -> {id: weight}
+        self._ranked = {}    # token -> ids by (weight desc, title length, id), merged for one-word queries
+        self._entries = {}   # id -> (title, href)
+        self._tokens = []    # sorted keys of _postings, bisected so the last query word matches as a prefix
+        self._tokens_dirty = False
+        self._generation = 0
+        self._pending = None  # links added while a rebuild is running
+    
+    @staticmethod
+    def tokenize(text):
+        return _SEARCH_TOKEN_RE.findall(text.lower()) if text else []
+    
+    @classmethod
+    def _index_links(cls, postings, entries, nodes):
+        """Add link nodes to postings/entries; returns the tokens touched"""
+        touched = set()
+        for node in nodes:
+            if node.get("type") != "link" or node.get("id") is None:
+                continue
+            node_id = node["id"]
+            title = node.get("title") or ""
+            href = node.get("href") or ""
+            entries[node_id] = (title, href)
+            weights = dict.fromkeys(cls.tokenize(title), cls.TITLE_WEIGHT)
+            for token in cls.tokenize(href):
+                if token not in cls.URL_NOISE:
+                    weights[token] = weights.get(token, 0) | cls.URL_WEIGHT
+            for token, weight in weights.items():
+                postings.setdefault(token, {})[node_id] = weight
+            touched.update(weights)
+        return touched
+    
+    @staticmethod
+    def _rank(postings, entries, token):
+        ids = postings[token]
+        return sorted(ids, key=lambda i: (-ids[i], len(entries[i][0]), i))
+    
+    def rebuild_async(self, nodes):
+        """Re-index nodes in the background; nodes is a flat list or a callable run on the worker"""
+        # The current index keeps answering until the new one is swapped in
+        if not callable(nodes):
+            nodes = list(nodes)
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+            self._pending = []
+        threading.Thread(target=self._rebuild, args=(generation, nodes), daemon=True).start()
+    
+    def _rebuild(self, generation, nodes):
+        if callable(nodes):
+            nodes = nodes()
+        postings = {}
+        entries = {}
+        self._index_links(postings, entries, nodes)
+        ranked = {token: self._rank(postings, entries, token)
+                  for token, ids in postings.items() if len(ids) >= self.PRERANK_MIN}
+        tokens = sorted(postings)
+        with self._lock:
+            if generation != self._generation:
+                return  # superseded by a newer rebuild
+            pending, self._pending = self._pending, None
+            self._postings = postings
+            self._ranked = ranked
+            self._entries = entries
+            self._tokens = tokens
+            self._tokens_dirty = False
+            if pending:
+                self._add_locked(pending)
+        print(f"[Search] Indexed {len(entries)} bookmarks, {len(tokens)} tokens")
+    
+    def add(self, nodes):
+        """Index freshly imported nodes right away (flat list, as returned by BookmarkIndex.add)"""
+        with self._lock:
+            if self._pending is not None:
+                self._pending.extend(nodes)
+            self._add_locked(nodes)
+    
+    def _add_locked(self, nodes):
+        before = len(self._postings)
+        for token in self._index_links(self._postings, self._entries, nodes):
+            self._ranked.pop(token, None)
+        if len(self._postings) != before:
+            self._tokens_dirty = True
+    
+    def _ranked_ids(self, token):
+        ranked = self._ranked.get(token)
+        if ranked is None:
+            ranked = self._ranked[token] = self._rank(self._postings, self._entries, token)
+        return ranked
+    
+    def _matching_tokens(self, word, prefix):
+        # Single characters only match whole tokens; a prefix that short matches nearly everything
+        if prefix and len(word) > 1:
+            lo = bisect_left(self._tokens, word)
+            hi = bisect_left(self._tokens, word + "\U0010ffff")
+            return self._tokens[lo:hi]
+        return [word] if word in self._postings else []
+    
+    def _ranked_stream(self, token, exact):
+        ids = self._postings[token]
+        entries = self._entries
+        for i in self._ranked_ids(token):
+            yield (-ids[i] * exact, len(entries[i][0]), i)
+    
+    def _top_single(self, word, tokens, limit):
+        """Merge the pre-ranked postings of every matching token, keeping each id's best rank"""
+        streams = [self._ranked_stream(token, 2 if token == word else 1) for token in tokens]
+        best = []
+        seen = set()
+        for _, _, node_id in heapq.merge(*streams):
+            if node_id not in seen:
+                seen.add(node_id)
+                best.append(node_id)
+                if len(best) == limit:
+                    break
+        return best
+    
+    def _word_scores(self, word, tokens, candidates=None):
+        """Best weight per id for one query word, limited to candidates when given"""
+        postings = self._postings
+        if candidates is not None:
+            cost = sum(min(len(candidates), len(postings[token])) for token in tokens)
+            if cost > len(candidates) * 16:
+                return self._rescore_candidates(word, candidates)
+        scores = {}
+        for token in tokens:
+            exact = 2 if token == word else 1
+            ids = postings[token]
+            if candidates is None:
+                hits = {i: w * exact for i, w in ids.items()}
+            elif len(candidates) < len(ids):
+                hits = {i: ids[i] * exact for i in candidates if i in ids}
+            else:
+                hits = {i: w * exact for i, w in ids.items() if i in candidates}
+            if not scores:
+                scores = hits
+                continue
+            for node_id, weight in hits.items():
+                if weight > scores.get(node_id, 0):
+                    scores[node_id] = weight
+        return scores
+    
+    def _rescore_candidates(self, word, candidates):
+        """Prefix word matching many tokens: cheaper to re-tokenize each candidate"""
+        postings = self._postings
+        scores = {}
+        for node_id in candidates:
+            title, href = self._entries[node_id]
+            for token in set(self.tokenize(title)).union(self.tokenize(href)):
+                if token.startswith(word):
+                    weight = postings.get(token, {}).get(node_id, 0) * (2 if token == word else 1)
+                    if weight > scores.get(node_id, 0):
+                        scores[node_id] = weight
+        return scores
+    
+    def search(self, query, limit=20):
+        """Best matches as [(id, title, href)]; every query word must match"""
+        words = self.tokenize(query)
+        if not words:
+            return []
+        with self._lock:
+            if self._tokens_dirty:
+                self._tokens = sorted(self._postings)
+                self._tokens_dirty = False
+            matches = [self._matching_tokens(word, n == len(words) - 1) for n, word in enumerate(words)]
+            if not all(matches):
+                return []
+            if len(words) == 1:
+                best = self._top_single(words[0], matches[0], limit)
+            else:
+                # Start from the rarest word and narrow the candidates with the others
+                order = sorted(range(len(words)), key=lambda n: sum(len(self._postings[t]) for t in matches[n]))
+                scores = None
+                for n in order:
+                    word_scores = self._word_scores(words[n], matches[n], scores)
+                    if scores is not None:
+                        word_scores = {i: s + scores[i] for i, s in word_scores.items()}
+                    scores = word_scores
+                    if not scores:
+                        return []
+                entries = self._entries
+                best = heapq.nsmallest(limit, scores, key=lambda i: (-scores[i], len(entries[i][0]), i))
+            return [(i,) + self._entries[i] for i in best]
+
+
+class StoredFolder(dict):
+    """Folder node read from BookmarkStore; its children are loaded on first access"""
+    
+    def __init__(self, store, fields):
+        super().__init__(fields)
+        self._store = store
+    
+    @property
+    def loaded(self):
+        return dict.__contains__(self, "children")
+    
+    def _load(self):
+        if not self.loaded:
+            dict.__setitem__(self, "children", self._store.load_children(self["id"]))
+    
+    def __getitem__(self, key):
+        if key == "children":
+            self._load()
+        return dict.__getitem__(self, key)
+    
+    def get(self, key, default=None):
+        if key == "children":
+            self._load()
+        return dict.get(self, key, default)
+
+
+class BookmarkStore:
+    """Bookmark tree in SQLite, one row per node (row id = node id), folders loaded when opened"""
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS bookmarks (
+            id INTEGER PRIMARY KEY,
+            parent INTEGER NOT NULL DEFAULT 0,
+            position INTEGER NOT NULL,
+            type TEXT NOT NULL,
+            title TEXT,
+            href TEXT
+        );
+        CREATE INDEX IF NOT EXISTS bookmarks_parent ON bookmarks (parent, position);
+    """
+    
+    def __init__(self, path):
+        self.path = path
+        self.on_children_loaded = None  # called with each folder's freshly loaded children
+        self.conn = None
+        self._writer = None  # last write thread; writes use their own connection, one at a time
+        try:
+            self.conn = self._connect()
+        except Exception as e:
+            print(f"[Bookmarks] Could not open {path}: {e}")
+    
+    def _connect(self):
+        conn = sqlite3.connect(self.path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(self.SCHEMA)
+        return conn
+    
+    def _node(self, row):
+        node_id, node_type, title, href = row
+        if node_type == "folder":
+            return StoredFolder(self, {"type": "folder", "id": node_id, "title": title})
+        return {"type": "link", "id": node_id, "title": title, "href": href}
+    
+    def load_children(self, parent_id=0):
+        if self.conn is None:
+            return []
+        try:
+            rows = self.conn.execute(
+                "SELECT id, type, title, href FROM bookmarks WHERE parent = ? ORDER BY position",
+                (parent_id,)).fetchall()
+        except Exception as e:
+            print(f"[Bookmarks] Failed to load folder {parent_id}: {e}")
+            return []
+        children = [self._node(row) for row in rows]
+        if parent_id and self.on_children_loaded is not None:
+            self.on_children_loaded(children)
+        return children
+    
+    def load_roots(self):
+        return self.load_children(0)
+    
+    def get_node(self, node_id):
+        if self.conn is None:
+            return None
+        row = self.conn.execute("SELECT id, type, title, href FROM bookmarks WHERE id = ?", (node_id,)).fetchone()
+        return self._node(row) if row else None
+    
+    def max_id(self):
+        if self.conn is None:
+            return 0
+        return self.conn.execute("SELECT COALESCE(MAX(id), 0) FROM bookmarks").fetchone()[0]
+    
+    def is_empty(self):
+        return self.conn is None or self.conn.execute("SELECT 1 FROM bookmarks LIMIT 1").fetchone() is None
+    
+    def read_links(self):
+        """Every link as a node dict; safe to call from any thread (waits for pending writes)"""
+        self.wait()
+        try:
+            conn = sqlite3.connect(self.path)
+            try:
+                rows = conn.execute("SELECT id, title, href FROM bookmarks WHERE type = 'link'").fetchall()
+            finally:
+                conn.close()
+        except Exception as e:
+            print(f"[Bookmarks] Failed to read links: {e}")
+            return []
+        return [{"type": "link", "id": node_id, "title": title, "href": href} for node_id, title, href in rows]
+    
+    @staticmethod
+    def _rows(nodes):
+        """(id, parent, position, type, title, href) for nodes and everything below them"""
+        # Unopened stored folders load here: the write replaces every row, so skipping them drops their contents
+        rows = []
+        stack = [(0, i, node) for i, node in reversed(list(enumerate(nodes)))]
+        while stack:
+            parent, position, node = stack.pop()
+            rows.append((node["id"], parent, position, node["type"], node.get("title"), node.get("href")))
+            if node["type"] == "folder":
+                children = node.get("children", [])
+                stack.extend((node["id"], i, child) for i, child in reversed(list(enumerate(children))))
+        return rows
+    
+    def _write(self, rows):
+        """Replace every row in one transaction; returns whether it committed"""
+        try:
+            conn = sqlite3.connect(self.path)
+            try:
+                with conn:
+                    conn.execute("DELETE FROM bookmarks")
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO bookmarks (id, parent, position, type, title, href) VALUES (?, ?, ?, ?, ?, ?)",
+                        rows)
+            finally:
+                conn.close()
+            print(f"[Bookmarks] Saved {len(rows)} bookmarks")
+            return True
+        except Exception as e:
+            print(f"[Bookmarks] Failed to save bookmarks: {e}")
+            return False
+    
+    def replace_all(self, roots, wait=False):
+        """Replace the stored tree with roots (nodes need ids); wait=True writes here and returns success"""
+        rows = self._rows(roots)
+        if wait:
+            self.wait()
+            return self._write(rows)
+        previous = self._writer
         
-        # Schedule credential check
-        if self._cred_check_timer:
-            self._cred_check_timer.stop()
-        self._cred_check_timer = QTimer()
-        self._cred_check_timer.setSingleShot(True)
-        self._cred_check_timer.timeout.connect(lambda: self._check_and_save_credentials())
-        self._cred_check_timer.start(2000)
+        def run():
+            if previous is not None:
+                previous.join()
+            self._write(rows)
         
-        # Auto-fill if we have credentials
-        if creds:
-            username = creds["username"].replace("\\", "\\\\").replace("'", "\\'").replace("\n", "")
-            password = creds["password"].replace("\\", "\\\\").replace("'", "\\'").replace("\n", "")
-            
-            fill_script = f"""
-            (function() {{
-                try {{
-                    var pass = document.querySelector('input[type="password"]');
-                    if (!pass) return;
-                    var user = document.querySelector('input[type="email"], input[type="text"]');
-                    if (user) {{
-                        user.value = '{username}';
-                        user.dispatchEvent(new Event('input', {{bubbles: true}}));
-                    }}
-                    pass.value = '{password}';
-                    pass.dispatchEvent(new Event('input', {{bubbles: true}}));
-                }} catch(e) {{}}
-            }})();
-            """
-            self.page().runJavaScript(fill_script)
+        self._writer = threading.Thread(target=run, daemon=True)
+        self._writer.start()
     
-    def _check_and_save_credentials(self):
-        if not self._browser:
-            return
+    def wait(self):
+        writer = self._writer
+        if writer is not None and writer is not threading.current_thread():
+            writer.join()
+
+
+class BookmarkImportWorker(QThread):
+    """Parses a bookmarks file off the GUI thread, streaming top-level nodes as they complete"""
+    
+    nodes_parsed = pyqtSignal(object)     # list of finished top-level nodes
+    nodes_restarted = pyqtSignal()        # nodes sent so far were not top-level after all
+    progress = pyqtSignal(int)            # percent of the file read
+    import_finished = pyqtSignal(object)  # final top-level list
+    import_failed = pyqtSignal(str)
+    
+    CHUNK_SIZE = 256 * 1024
+    
+    def __init__(self, path, parent=None):
+        super().__init__(parent)
+        self.path = path
+    
+    def run(self):
+        try:
+            total = max(os.path.getsize(self.path), 1)
+            decoder = codecs.getincrementaldecoder("utf-8")()
+            parser = BookmarksHTMLParser()
+            done = 0
+            with open(self.path, "rb") as f:
+                while True:
+                    if self.isInterruptionRequested():
+                        return
+                    chunk = f.read(self.CHUNK_SIZE)
+                    parser.feed(decoder.decode(chunk, final=not chunk))
+                    batch = parser.take_completed()
+                    if parser.restarted:
+                        parser.restarted = False
+                        self.nodes_restarted.emit()
+                    if batch:
+                        self.nodes_parsed.emit(batch)
+                    if not chunk:
+                        break
+                    done += len(chunk)
+                    self.progress.emit(min(100, done * 100 // total))
+            parser.close()
+            nodes = parser.result()
+            if not self.isInterruptionRequested():
+                self.import_finished.emit(nodes)
+        except Exception as e:
+            self.import_failed.emit(str(e))
+
+
+class QuickOpenPalette(QDialog):
+    """Ctrl+K bookmark search: type to filter, Enter opens the selected bookmark"""
+    
+    MAX_RESULTS = 20
+    
+    def __init__(self, browser):
+        super().__init__(browser)
+        self._browser = browser
+        self.setWindowFlags(Qt.WindowType.Popup)
+        self.setFixedWidth(560)
+        self.setStyleSheet("""
+            QDialog { background:#2d2d2d; border:1px solid #505050; border-radius:8px; }
+            QLineEdit { background:#3c3c3c; color:white; border:none; border-radius:6px; padding:8px 10px; font-size:14px; }
+            QListWidget { background:#2d2d2d; color:white; border:none; }
+            QListWidget::item { padding:6px 10px; border-radius:6px; }
+            QListWidget::item:selected { background:#505050; }
+        """)
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(8, 8, 8, 8)
+        layout.setSpacing(6)
         
-        def handle_result(result):
-            if result and isinstance(result, dict):
-                username = result.get("username", "")
-                password = result.get("password", "")
-                if username and password:
-                    domain = self._browser.credentials_manager.get_domain_from_url(self.url().toString())
-                    self._browser.credentials_manager.save_credentials(domain, username, password)
+        self.query = QLineEdit()
+        self.query.setPlaceholderText("Search bookmarks")
+        self.query.textChanged.connect(self._update_results)
+        self.query.returnPressed.connect(self._open_selected)
+        self.query.installEventFilter(self)
+        layout.addWidget(self.query)
         
-        self.page().runJavaScript("window._gbrowserCreds || null", handle_result)
+        self.results = QListWidget()
+        self.results.setFixedHeight(320)
+        self.results.itemActivated.connect(self._open_item)
+        layout.addWidget(self.results)
+    
+    def eventFilter(self, obj, event):
+        # Arrow keys in the search field move the selection in the result list
+        if obj is self.query and event.type() == QEvent.Type.KeyPress:
+            if event.key() in (Qt.Key.Key_Up, Qt.Key.Key_Down, Qt.Key.Key_PageUp, Qt.Key.Key_PageDown):
+                QApplication.sendEvent(self.results, event)
+                return True
+        return super().eventFilter(obj, event)
+    
+    def popup(self):
+        self.query.clear()
+        self.results.clear()
+        self.move(self._browser.mapToGlobal(QPoint((self._browser.width() - self.width()) // 2, 60)))
+        self.show()
+        self.query.setFocus()
+    
+    def _update_results(self, text):
+        self.results.clear()
+        for node_id, title, href in self._browser.bookmark_search.search(text, self.MAX_RESULTS):
+            item = QListWidgetItem(f"{title or href}  -  {href}")
+            item.setData(Qt.ItemDataRole.UserRole, node_id)
+            item.setToolTip(href)
+            self.results.addItem(item)
+        if self.results.count():
+            self.results.setCurrentRow(0)
+    
+    def _open_selected(self):
+        item = self.results.currentItem()
+        if item is not None:
+            self._open_item(item)
+    
+    def _open_item(self, item):
+        node_id = item.data(Qt.ItemDataRole.UserRole)
+        self.close()
+        self._browser._open_bookmark(node_id)
 
 
 class Browser(QMainWindow):
-    def __init__(self):
+    first_painted = pyqtSignal()
+    
+    def __init__(self, performance_profile=None):
         super().__init__()
         self.setWindowTitle("Gorstak's Browser")
         self.setMinimumSize(800, 600)
         self.setWindowFlags(Qt.WindowType.Window)
-
-        self.config = self._load_config()
-        self.bookmarks = self.config.get("bookmarks", [])
+        self._first_painted = False
+        self._deferred_icons = []  # (button, svg); QtSvg is not loaded before the first frame
+
+        self.config_store = ConfigStore(CONFIG_FILE, collect=self._collect_config)
+        self.config = self.config_store.data
+        if performance_profile not in PERFORMANCE_PROFILES:
+            performance_profile = configured_performance_profile()
+        self.performance_profile = performance_profile
+        self.performance = PERFORMANCE_PROFILES[performance_profile]
+        self.bookmarks = []
+        self.bookmark_index = BookmarkIndex()
+        self.bookmark_store = BookmarkStore(BOOKMARKS_DB)
+        self.bookmark_store.on_children_loaded = self.bookmark_index.add
+        self.bookmark_search = BookmarkSearchIndex()
+        self.quick_open = None
         
         self.credentials_manager = CredentialsManager()
         
@@ -403,11 +2910,10 @@ class Browser(QMainWindow):
             geom.get("width", 1280),
             geom.get("height", 820)
         )
-        if geom.get("maximized", False):
-            self.showMaximized()
 
         central = QWidget()
         central.setStyleSheet("background:#1e1e1e;")
+        central.installEventFilter(self)  # its first Paint event marks the first frame
         self.setCentralWidget(central)
         layout = QVBoxLayout(central)
         layout.setContentsMargins(0, 0, 0, 0)
@@ -420,13 +2926,32 @@ class Browser(QMainWindow):
         nlay.setContentsMargins(12, 8, 12, 8)
         nlay.setSpacing(12)
 
+        self.cache_manager = CacheManager(quotas=self.config.get("cache_quotas_mb")).startup()
         self.profile = QWebEngineProfile("GBrowser", self)
         self.profile.setPersistentStoragePath(os.path.join(CONFIG_DIR, "storage"))
         self.profile.setCachePath(os.path.join(CONFIG_DIR, "cache"))
         self.profile.setPersistentCookiesPolicy(QWebEngineProfile.PersistentCookiesPolicy.ForcePersistentCookies)
+        self.profile.setHttpCacheMaximumSize(self.performance["disk_cache_mb"] * 1024 * 1024)
+        settings = self.profile.settings()
+        for name, value in {**DEFAULT_WEB_ATTRIBUTES, **self.performance["page"]}.items():
+            settings.setAttribute(getattr(QWebEngineSettings.WebAttribute, name), value)
+        self.site_settings = SiteSettings(self.config.get("site_settings"))
         
-        self.ad_blocker = AdBlocker(self)
+        self.ad_blocker = AdBlocker(self, native=self.config.get("native_filter", True))
         self.profile.setUrlRequestInterceptor(self.ad_blocker)
+        self.ad_blocker.filters_loaded.connect(self._install_generic_css)
+        self.ad_blocker.load_filters()
+        STARTUP.mark("profile and ad blocker ready")
+        
+        stats_action = QAction("Dump Ad Blocker Stats", self)
+        stats_action.setShortcut("Ctrl+Shift+S")
+        stats_action.triggered.connect(self._on_dump_adblock_stats)
+        self.addAction(stats_action)
+        
+        quick_open_action = QAction("Search Bookmarks", self)
+        quick_open_action.setShortcut("Ctrl+K")
+        quick_open_action.triggered.connect(self.show_quick_open)
+        self.addAction(quick_open_action)
         
         self.tabs = QTabWidget()
         self.tabs.setDocumentMode(True)
@@ -434,6 +2959,14 @@ class Browser(QMainWindow):
         self.tabs.setMovable(True)
         self.tabs.tabCloseRequested.connect(self.close_tab)
         self.tabs.currentChanged.connect(self._on_tab_changed)
+        self.tabs.tabBar().tabMoved.connect(lambda *_: self.config_store.save())
+        self.tab_lifecycle = TabLifecycleManager(
+            self,
+            memory_budget_mb=self.config.get("memory_budget_mb", 2048),
+            max_live_tabs=self.config.get("max_live_tabs", 0),
+            enabled=self.config.get("discard_tabs", True),
+            freeze_after=self.config.get("freeze_background_after", 120))
+        self.tab_pool = TabPool(self, self.config.get("spare_tabs", self.performance["spare_tabs"]))
         self.tabs.setStyleSheet("""
             QTabWidget::pane { border: 0; }
             QTabBar::tab {
@@ -459,8 +2992,8 @@ class Browser(QMainWindow):
             }
         """)
         
-        last_url = self.config.get("last_url", "https://www.google.com")
-        self._add_tab(last_url)
+        self._restore_session()
+        STARTUP.mark("session restored")
 
         back_svg = '<svg width="24" height="24"><path d="M20 11 H7.83 l5.59-5.59 L12 4 l-8 8 8 8 1.41-1.41 L7.83 13 H20 v-2 z" fill="#ccc"/></svg>'
         forward_svg = '<svg width="24" height="24"><path d="M12 4 l-1.41 1.41 L16.17 11 H4 v2 h12.17 l-5.58 5.59 L12 20 l8-8 z" fill="#ccc"/></svg>'
@@ -472,7 +3005,7 @@ class Browser(QMainWindow):
                               lambda: self._current_browser().setUrl(QUrl("https://www.google.com"))]):
             btn = QPushButton()
             btn.setFixedSize(48, 48)
-            btn.setIcon(svg_icon(svg))
+            self._deferred_icons.append((btn, svg))
             btn.setIconSize(QSize(24, 24))
             btn.setStyleSheet("""
                 QPushButton { background:#3c3c3c; border-radius:24px; }
@@ -484,7 +3017,7 @@ class Browser(QMainWindow):
 
         new_tab_btn = QPushButton()
         new_tab_btn.setFixedSize(48, 48)
-        new_tab_btn.setIcon(svg_icon(NEW_TAB_SVG))
+        self._deferred_icons.append((new_tab_btn, NEW_TAB_SVG))
         new_tab_btn.setIconSize(QSize(24, 24))
         new_tab_btn.setStyleSheet("""
             QPushButton { background:#3c3c3c; border-radius:24px; }
@@ -541,11 +3074,46 @@ class Browser(QMainWindow):
         self.bookmarks_container_layout = QHBoxLayout(self.bookmarks_container)
         self.bookmarks_container_layout.setContentsMargins(0, 0, 0, 0)
         self.bookmarks_container_layout.setSpacing(6)
+        # One stylesheet for every bookmark button instead of one per widget
+        self.bookmarks_container.setStyleSheet("""
+            QPushButton, QToolButton { background:#3c3c3c; color:white; border-radius:6px; padding:6px 10px; }
+            QPushButton:hover, QToolButton:hover { background:#505050; }
+        """)
+        self.bookmarks_placeholder = QLabel("No bookmarks loaded")
+        self.bookmarks_placeholder.setStyleSheet("color: #666; padding: 6px 10px;")
+        self.bookmarks_placeholder.setVisible(False)
+        self.bookmarks_container_layout.addWidget(self.bookmarks_placeholder)
+        self.bookmarks_spacer = QWidget()
+        self.bookmarks_spacer.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Preferred)
+        self.bookmarks_container_layout.addWidget(self.bookmarks_spacer)
         bb_layout.addWidget(self.bookmarks_container)
 
+        # Import progress (shown while a bookmarks file is parsed in the background)
+        self.import_progress = QProgressBar()
+        self.import_progress.setRange(0, 100)
+        self.import_progress.setFixedSize(140, 16)
+        self.import_progress.setTextVisible(False)
+        self.import_progress.setStyleSheet("""
+            QProgressBar { background:#3c3c3c; border:none; border-radius:8px; }
+            QProgressBar::chunk { background:#5a8dee; border-radius:8px; }
+        """)
+        self.import_progress.setVisible(False)
+        bb_layout.addWidget(self.import_progress)
+        
+        self.import_cancel_btn = QPushButton("Cancel")
+        self.import_cancel_btn.setFixedHeight(32)
+        self.import_cancel_btn.setToolTip("Cancel bookmarks import")
+        self.import_cancel_btn.setStyleSheet("""
+            QPushButton { background:#3c3c3c; color:white; border-radius:6px; padding:6px 10px; }
+            QPushButton:hover { background:#505050; }
+        """)
+        self.import_cancel_btn.setVisible(False)
+        self.import_cancel_btn.clicked.connect(self._cancel_bookmarks_import)
+        bb_layout.addWidget(self.import_cancel_btn)
+        
         self.overflow_btn = QPushButton()
         self.overflow_btn.setFixedSize(32, 32)
-        self.overflow_btn.setIcon(svg_icon(OVERFLOW_SVG))
+        self._deferred_icons.append((self.overflow_btn, OVERFLOW_SVG))
         self.overflow_btn.setStyleSheet("""
             QPushButton { background:#3c3c3c; border-radius:16px; }
             QPushButton:hover { background:#505050; }
@@ -558,59 +3126,179 @@ class Browser(QMainWindow):
         layout.addWidget(self.tabs, 1)
 
         # internal data
-        self.overflow_items = []
+        self._bookmark_widgets = []  # (key, node, widget) in bar order
+        self._bookmark_width_cache = {}  # widget -> (text, width)
+        self._overflow_prefix = None  # cumulative widths; None until measured
+        self._overflow_shown = None  # number of widgets currently shown
+        self._overflow_menu = None
+        self._import_worker = None
+        self._import_previous = None
         self._overflow_timer = QTimer()
         self._overflow_timer.setSingleShot(True)
         self._overflow_timer.timeout.connect(self._evaluate_overflow)
         self.resizeEvent = self._on_resize_override
         
-        saved_bookmarks = self.config.get("bookmarks", [])
-        if saved_bookmarks:
-            self.bookmarks = saved_bookmarks
-            self._rebuild_bookmarks_bar()
-
-    def _add_tab(self, url="https://www.google.com"):
-        tab = BrowserTab(self.profile, self, url)
+        # The first tab was selected before _on_tab_changed was wired up
+        self.tab_lifecycle.activated(self._current_browser())
+        STARTUP.mark("window built")
+        # Shown last: showEvent and the first paint expect a fully built window
+        if geom.get("maximized", False):
+            self.showMaximized()
+    
+    # ------------------------
+    # Startup
+    # ------------------------
+    def showEvent(self, event):
+        super().showEvent(event)
+        if not self._first_painted:
+            # Safety net only: the deferred work must run even if no Paint is ever seen
+            QTimer.singleShot(3000, lambda: self._on_first_paint("no paint seen after 3 s"))
+    
+    def eventFilter(self, obj, event):
+        if not self._first_painted and event.type() == QEvent.Type.Paint and obj is self.centralWidget():
+            self._on_first_paint("first paint")
+        return super().eventFilter(obj, event)
+    
+    def _on_first_paint(self, phase):
+        if self._first_painted:
+            return
+        self._first_painted = True
+        self.centralWidget().removeEventFilter(self)
+        STARTUP.mark(phase)
+        # Let the frame reach the screen before doing the deferred work
+        QTimer.singleShot(0, self._after_first_paint)
+    
+    def _after_first_paint(self):
+        """Work the first frame does not need: icons, bookmarks bar, cache scan"""
+        for btn, svg in self._deferred_icons:
+            btn.setIcon(svg_icon(svg))
+        self._deferred_icons = []
+        STARTUP.mark("icons rendered")
+        
+        self._load_bookmarks_bar()
+        STARTUP.mark("bookmarks bar loaded")
+        
+        QTimer.singleShot(10000, self.cache_manager.scan_async)
+        self.tab_pool.schedule_refill()
+        self.first_painted.emit()
+    
+    def _load_bookmarks_bar(self):
+        # Bookmarks used to live in the config file; move them to the store once.
+        # They stay in the config until the store write has committed.
+        store = self.bookmark_store
+        legacy_bookmarks = self.config.get("bookmarks")
+        if legacy_bookmarks is not None and store.conn is not None:
+            migrated = not legacy_bookmarks or not store.is_empty()
+            if not migrated:
+                self.bookmark_index.rebuild(legacy_bookmarks)  # assigns the ids rows are keyed by
+                migrated = store.replace_all(legacy_bookmarks, wait=True)
+            if migrated:
+                self.config.pop("bookmarks", None)
+                self.config_store.save()
+        if legacy_bookmarks is not None and "bookmarks" in self.config:
+            # Store unavailable or the write failed: keep running from the config copy
+            self._set_bookmarks(legacy_bookmarks)
+        else:
+            self.bookmark_index.reserve(store.max_id())
+            saved_bookmarks = store.load_roots()
+            if saved_bookmarks:
+                self._set_bookmarks(saved_bookmarks)
+
+    def _create_tab(self, url):
+        tab = self.tab_pool.take()
+        if tab is None:
+            tab = BrowserTab(self.profile, self, url)
+        else:
+            tab.reuse(url)
         tab.titleChanged.connect(lambda title, t=tab: self._update_tab_title(t, title))
         tab.urlChanged.connect(lambda url, t=tab: self._update_url_bar(t, url))
+        return tab
+    
+    def _add_tab(self, url="https://www.google.com"):
+        tab = self._create_tab(url)
         idx = self.tabs.addTab(tab, "New Tab")
         self.tabs.setCurrentIndex(idx)
         return tab
     
     def create_new_tab(self, url=None):
         """Called by CustomWebPage.createWindow for target=_blank links"""
-        tab = BrowserTab(self.profile, self, url)
-        tab.titleChanged.connect(lambda title, t=tab: self._update_tab_title(t, title))
-        tab.urlChanged.connect(lambda url, t=tab: self._update_url_bar(t, url))
-        idx = self.tabs.addTab(tab, "New Tab")
-        self.tabs.setCurrentIndex(idx)
-        return tab.page()
+        return self._add_tab(url).page()
+    
+    def _restore_session(self):
+        """Reopen the saved tabs; only the active one gets a live view, the rest are placeholders"""
+        session = self.config.get("session") or {}
+        saved = [t for t in session.get("tabs", []) if isinstance(t, dict) and t.get("url")]
+        if not saved:
+            self._add_tab(self.config.get("last_url", "https://www.google.com"))
+            return
+        try:
+            active = min(max(int(session.get("active", 0)), 0), len(saved) - 1)
+        except (TypeError, ValueError):
+            active = 0
+        for i, t in enumerate(saved):
+            title = t.get("title") or ""
+            widget = self._create_tab(t["url"]) if i == active else TabPlaceholder(t["url"], title)
+            self.tabs.addTab(widget, self._short_title(title))
+        self.tabs.setCurrentIndex(active)
+        print(f"[Session] Restored {len(saved)} tabs")
+    
+    def _materialize_tab(self, index):
+        """Swap the placeholder at index for a live BrowserTab, keeping its position and label"""
+        placeholder = self.tabs.widget(index)
+        if not isinstance(placeholder, TabPlaceholder):
+            return placeholder
+        tab = self._create_tab(placeholder.restore_url)
+        text = self.tabs.tabText(index)
+        current = self.tabs.currentIndex() == index
+        self.tabs.blockSignals(True)
+        try:
+            self.tabs.removeTab(index)
+            self.tabs.insertTab(index, tab, text)
+            if current:
+                self.tabs.setCurrentIndex(index)
+        finally:
+            self.tabs.blockSignals(False)
+        placeholder.deleteLater()
+        return tab
     
     def close_tab(self, index):
         if self.tabs.count() > 1:
             widget = self.tabs.widget(index)
             self.tabs.removeTab(index)
+            self.tab_lifecycle.forget(widget)
             widget.deleteLater()
+            self.config_store.save()
         else:
             # Last tab - close window
             self.close()
     
+    @staticmethod
+    def _short_title(title):
+        title = title or ""
+        short_title = title[:25] + "..." if len(title) > 25 else title
+        return short_title or "New Tab"
+    
     def _update_tab_title(self, tab, title):
         idx = self.tabs.indexOf(tab)
         if idx >= 0:
-            short_title = title[:25] + "..." if len(title) > 25 else title
-            self.tabs.setTabText(idx, short_title or "New Tab")
+            self.tabs.setTabText(idx, self._short_title(title))
+            self.config_store.save()
     
     def _update_url_bar(self, tab, url):
         if tab == self._current_browser():
             self.url_bar.setText(url.toString())
+            self.config_store.save()
     
     def _on_tab_changed(self, index):
         if not hasattr(self, 'url_bar'):
             return
+        if isinstance(self.tabs.widget(index), TabPlaceholder):
+            self._materialize_tab(index)
         browser = self._current_browser()
+        self.tab_lifecycle.activated(browser)
         if browser:
             self.url_bar.setText(browser.url().toString())
+        self.config_store.save()
     
     def _current_browser(self):
         return self.tabs.currentWidget()
@@ -630,20 +3318,8 @@ class Browser(QMainWindow):
         if b:
             b.reload()
 
-    def _load_config(self):
-        """Load config from file"""
-        if not os.path.exists(CONFIG_FILE):
-            return {}
-        try:
-            with open(CONFIG_FILE, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except Exception:
-            return {}
-    
-    def _save_config(self):
-        """Save config to file"""
-        os.makedirs(CONFIG_DIR, exist_ok=True)
-        
+    def _collect_config(self):
+        """Copy window state into self.config (runs before every save)"""
         geom = self.geometry()
         self.config["geometry"] = {
             "x": geom.x(),
@@ -656,13 +3332,21 @@ class Browser(QMainWindow):
         browser = self._current_browser()
         if browser:
             self.config["last_url"] = browser.url().toString()
-        self.config["bookmarks"] = self.bookmarks
         
-        try:
-            with open(CONFIG_FILE, "w", encoding="utf-8") as f:
-                json.dump(self.config, f, indent=2)
-        except Exception as e:
-            print(f"Failed to save config: {e}")
+        tabs = []
+        active = 0
+        for i in range(self.tabs.count()):
+            widget = self.tabs.widget(i)
+            url = widget.url().toString() or getattr(widget, "requested_url", "")
+            if url:
+                if i == self.tabs.currentIndex():
+                    active = len(tabs)
+                tabs.append({"url": url, "title": widget.title()})
+        self.config["session"] = {"tabs": tabs, "active": active}
+        
+    def _save_config(self):
+        """Save config now and wait until it is on disk (used on exit)"""
+        self.config_store.flush(wait=True)
     
     # ------------------------
     # Bookmarks file handling
@@ -671,158 +3355,205 @@ class Browser(QMainWindow):
         file_path, _ = QFileDialog.getOpenFileName(self, "Open Bookmarks HTML", "", "HTML Files (*.html *.htm);;All Files (*)")
         if not file_path:
             return
-        try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                html = f.read()
-            self._parse_bookmarks_html(html)
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to open bookmarks file:\n{e}")
+        self._start_bookmarks_import(file_path)
 
-    def _parse_bookmarks_html(self, html):
-        try:
-            soup = BeautifulSoup(html, "html5lib")
-        except Exception:
-            soup = BeautifulSoup(html, "html.parser")
+    def _start_bookmarks_import(self, path):
+        """Parse a bookmarks file in a worker thread, filling the bar as top-level nodes arrive"""
+        if self._import_worker is not None:
+            self._cancel_bookmarks_import()
         
-        def parse_dl(dl_tag, depth=0):
-            """Robust recursive parser for Netscape-style bookmarks HTML."""
-            nodes = []
-            
-            all_dts = dl_tag.find_all("dt")
-            direct_dts = []
-            for dt in all_dts:
-                parent = dt.parent
-                while parent and parent.name != "dl":
-                    parent = parent.parent
-                if parent is dl_tag:
-                    direct_dts.append(dt)
-            
-            for dt in direct_dts:
-                a = dt.find("a", recursive=False) or dt.find("a")
-                h3 = dt.find(["h3", "h1", "h2"], recursive=False) or dt.find(["h3", "h1", "h2"])
-
-                if a and h3:
-                    elem_str = str(dt)
-                    h3_pos = elem_str.find(str(h3))
-                    a_pos = elem_str.find(str(a))
-                    if h3_pos < a_pos:
-                        a = None
-                    else:
-                        h3 = None
-
-                if a and not h3:
-                    title = (a.get_text(strip=True) or a.get("href") or "").strip()
-                    href = a.get("href")
-                    if href:
-                        nodes.append({"type": "link", "title": title or href, "href": href})
-                    continue
-
-                if h3:
-                    folder_title = (h3.get_text(strip=True) or "Folder").strip()
-                    children = []
-
-                    sibling = dt.next_sibling
-                    while sibling:
-                        if hasattr(sibling, 'name'):
-                            if sibling.name == "dl":
-                                children = parse_dl(sibling, depth + 1)
-                                break
-                            elif sibling.name == "dt":
-                                break
-                        sibling = sibling.next_sibling
-                    
-                    if not children:
-                        child_dl = dt.find("dl")
-                        if child_dl:
-                            children = parse_dl(child_dl, depth + 1)
-                    
-                    nodes.append({"type": "folder", "title": folder_title, "children": children})
-
-            return nodes
-
-        top_dl = soup.find("dl")
-        if top_dl:
-            parsed = parse_dl(top_dl)
-            if len(parsed) == 1 and parsed[0].get("type") == "folder":
-                parsed = parsed[0].get("children", parsed)
-        else:
-            parsed = []
-            for a in soup.find_all("a"):
-                href = a.get("href")
-                if href:
-                    parsed.append({
-                        "type": "link",
-                        "title": (a.get_text(strip=True) or href).strip(),
-                        "href": href
-                    })
-
-        self.bookmarks = parsed
-        self._rebuild_bookmarks_bar()
+        worker = BookmarkImportWorker(path, self)
+        worker.nodes_parsed.connect(lambda nodes, w=worker: self._on_import_nodes(w, nodes))
+        worker.nodes_restarted.connect(lambda w=worker: self._on_import_restarted(w))
+        worker.progress.connect(lambda percent, w=worker: self._on_import_progress(w, percent))
+        worker.import_finished.connect(lambda nodes, w=worker: self._on_import_finished(w, nodes))
+        worker.import_failed.connect(lambda message, w=worker: self._on_import_failed(w, message))
+        worker.finished.connect(worker.deleteLater)
+        self._import_worker = worker
+        
+        self._import_previous = self.bookmarks
+        self._set_bookmarks([])
+        self.import_progress.setValue(0)
+        self.import_progress.setVisible(True)
+        self.import_cancel_btn.setVisible(True)
+        worker.start()
+    
+    def _end_bookmarks_import(self):
+        self._import_worker = None
+        self._import_previous = None
+        self.import_progress.setVisible(False)
+        self.import_cancel_btn.setVisible(False)
+    
+    def _cancel_bookmarks_import(self):
+        """Stop a running import and put the previous bookmarks back"""
+        worker = self._import_worker
+        if worker is None:
+            return
+        worker.requestInterruption()
+        previous = self._import_previous
+        self._end_bookmarks_import()
+        self._set_bookmarks(previous if previous is not None else [])
+    
+    def _on_import_nodes(self, worker, nodes):
+        if worker is not self._import_worker:
+            return
+        layout = self.bookmarks_container_layout
+        self.bookmark_search.add(self.bookmark_index.add(nodes))
+        for node in nodes:
+            self.bookmarks.append(node)
+            key = self._bookmark_key(node)
+            if key is None:
+                continue
+            widget = self._make_bookmark_widget(node)
+            self._bookmark_widgets.append((key, node, widget))
+            # Keep the trailing spacer last
+            layout.insertWidget(layout.count() - 1, widget)
+        self._invalidate_overflow()
+        self._overflow_timer.start(120)
+    
+    def _on_import_restarted(self, worker):
+        if worker is self._import_worker:
+            self._set_bookmarks([])
+    
+    def _on_import_progress(self, worker, percent):
+        if worker is self._import_worker:
+            self.import_progress.setValue(percent)
+    
+    def _on_import_finished(self, worker, nodes):
+        if worker is not self._import_worker:
+            return
+        self._end_bookmarks_import()
+        self._set_bookmarks(nodes, save=True)
+    
+    def _on_import_failed(self, worker, message):
+        if worker is not self._import_worker:
+            return
+        previous = self._import_previous
+        self._end_bookmarks_import()
+        self._set_bookmarks(previous if previous is not None else [])
+        QMessageBox.critical(self, "Error", f"Failed to open bookmarks file:\n{message}")
 
     # ------------------------
     # Build bookmarks bar UI
     # ------------------------
-    def _clear_bookmarks_container(self):
-        while self.bookmarks_container_layout.count():
-            item = self.bookmarks_container_layout.takeAt(0)
-            w = item.widget()
-            if w:
-                w.deleteLater()
+    def _set_bookmarks(self, nodes, save=False):
+        """Replace the bookmark tree, re-index it and update the bar; save=True also stores it"""
+        self.bookmarks = nodes
+        self.bookmark_index.rebuild(nodes)
+        if save:
+            self.bookmark_store.replace_all(nodes)
+        # The store has every link, including folders that have not been opened yet
+        self.bookmark_search.rebuild_async(self.bookmark_store.read_links if nodes else [])
+        self._rebuild_bookmarks_bar()
+    
+    def show_quick_open(self):
+        if self.quick_open is None:
+            self.quick_open = QuickOpenPalette(self)
+        self.quick_open.popup()
+    
+    @staticmethod
+    def _bookmark_key(node):
+        """Identity of a top-level node's widget; equal keys can share a widget"""
+        if node["type"] == "link":
+            return ("link", node.get("title", node.get("href", "untitled")), node.get("href"))
+        if node["type"] == "folder":
+            return ("folder", node.get("title", "Folder"))
+        return None
 
     def _rebuild_bookmarks_bar(self):
-        self._clear_bookmarks_container()
-        self.overflow_items = []
-
-        if not self.bookmarks:
-            label = QLabel("No bookmarks loaded")
-            label.setStyleSheet("color: #666; padding: 6px 10px;")
-            self.bookmarks_container_layout.addWidget(label)
-            spacer = QWidget()
-            spacer.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Preferred)
-            self.bookmarks_container_layout.addWidget(spacer)
-            return
+        """Reconcile the bar with self.bookmarks, reusing widgets whose key is unchanged"""
+        layout = self.bookmarks_container_layout
+
+        # Existing widgets by key, in bar order so duplicates are reused front to back
+        pool = {}
+        for key, node, widget in reversed(self._bookmark_widgets):
+            pool.setdefault(key, []).append((node, widget))
 
+        entries = []
         for node in self.bookmarks:
-            if node["type"] == "link":
-                btn = QPushButton(node.get("title", node.get("href", "untitled")))
-                btn.setCursor(Qt.CursorShape.PointingHandCursor)
-                btn.setProperty("href", node.get("href"))
-                btn.setStyleSheet("""
-                    QPushButton { background:#3c3c3c; color:white; border-radius:6px; padding:6px 10px; }
-                    QPushButton:hover { background:#505050; }
-                """)
-                btn.clicked.connect(lambda checked, h=node.get("href"): self._open_href(h))
-                self.bookmarks_container_layout.addWidget(btn)
-            elif node["type"] == "folder":
-                tb = QToolButton()
-                tb.setText(node.get("title", "Folder"))
-                tb.setPopupMode(QToolButton.ToolButtonPopupMode.InstantPopup)
-                tb.setStyleSheet("""
-                    QToolButton { background:#3c3c3c; color:white; border-radius:6px; padding:6px 10px; }
-                    QToolButton:hover { background:#505050; }
-                """)
-                menu = QMenu()
-
-                def add_children(m, children):
-                    for c in children:
-                        if c["type"] == "link":
-                            a = QAction(c.get("title", c.get("href")), self)
-                            href = c.get("href")
-                            a.triggered.connect(lambda checked, h=href: self._open_href(h))
-                            m.addAction(a)
-                        elif c["type"] == "folder":
-                            sub = QMenu(c.get("title", "Folder"), self)
-                            add_children(sub, c.get("children", []))
-                            m.addMenu(sub)
-
-                add_children(menu, node.get("children", []))
-                tb.setMenu(menu)
-                self.bookmarks_container_layout.addWidget(tb)
-
-        spacer = QWidget()
-        spacer.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Preferred)
-        self.bookmarks_container_layout.addWidget(spacer)
+            key = self._bookmark_key(node)
+            if key is None:
+                continue
+            reusable = pool.get(key)
+            if reusable:
+                old_node, widget = reusable.pop()
+                if old_node is not node and key[0] == "link":
+                    widget.setProperty("bookmark_id", node.get("id"))
+                elif old_node is not node and key[0] == "folder":
+                    # Same folder button, new contents: swap in a fresh lazy menu
+                    old_menu = widget.menu()
+                    widget.setMenu(self._make_folder_menu(node, widget))
+                    if old_menu is not None:
+                        old_menu.deleteLater()
+            else:
+                widget = self._make_bookmark_widget(node)
+            entries.append((key, node, widget))
+
+        for leftovers in pool.values():
+            for _, widget in leftovers:
+                layout.removeWidget(widget)
+                widget.deleteLater()
+        
+        # Only move widgets that are out of place (the placeholder sits at index 0)
+        for i, (_, _, widget) in enumerate(entries, 1):
+            item = layout.itemAt(i)
+            if item is None or item.widget() is not widget:
+                layout.removeWidget(widget)
+                layout.insertWidget(i, widget)
+        
+        self._bookmark_widgets = entries
+        self.bookmarks_placeholder.setVisible(not entries and self._import_worker is None)
+        self._invalidate_overflow()
         self._overflow_timer.start(120)
+    
+    def _make_bookmark_widget(self, node):
+        """Button for a top-level link, or a menu button for a folder"""
+        if node["type"] == "link":
+            btn = QPushButton(node.get("title", node.get("href", "untitled")))
+            btn.setCursor(Qt.CursorShape.PointingHandCursor)
+            btn.setProperty("href", node.get("href"))
+            btn.setProperty("bookmark_id", node.get("id"))
+            btn.clicked.connect(lambda checked, b=btn: self._open_bookmark(b.property("bookmark_id")))
+            return btn
+        if node["type"] == "folder":
+            tb = QToolButton()
+            tb.setText(node.get("title", "Folder"))
+            tb.setPopupMode(QToolButton.ToolButtonPopupMode.InstantPopup)
+            tb.setMenu(self._make_folder_menu(node, tb))
+            return tb
+        return None
+    
+    def _make_folder_menu(self, node, parent):
+        """Empty folder menu that fills itself the first time it is opened"""
+        menu = QMenu(node.get("title", "Folder"), parent)
+        menu.aboutToShow.connect(lambda m=menu, n=node: self._populate_folder_menu(m, n))
+        return menu
+    
+    def _populate_folder_menu(self, menu, node):
+        if menu.property("populated"):
+            return
+        menu.setProperty("populated", True)
+        for c in node.get("children", []):
+            if c["type"] == "link":
+                menu.addAction(self._make_bookmark_action(c, menu))
+            elif c["type"] == "folder":
+                # Nested folders stay empty until they are opened themselves
+                menu.addMenu(self._make_folder_menu(c, menu))
+    
+    def _make_bookmark_action(self, node, parent):
+        """Menu action for a link node; it carries the node id, not the href"""
+        a = QAction(node.get("title", node.get("href")), parent)
+        a.setData(node.get("id"))
+        a.triggered.connect(lambda checked, act=a: self._open_bookmark(act.data()))
+        return a
+    
+    def _open_bookmark(self, node_id):
+        node = self.bookmark_index.get(node_id)
+        if node is None:
+            # Search results can point into folders that were never loaded
+            node = self.bookmark_store.get_node(node_id)
+        if node is not None:
+            self._open_href(node.get("href"))
 
     def _open_href(self, href):
         if not href:
@@ -840,93 +3571,74 @@ class Browser(QMainWindow):
     # ------------------------
     def _on_resize_override(self, event):
         QMainWindow.resizeEvent(self, event)
-        self._overflow_timer.start(120)
+        self.config_store.save()
+        if self._overflow_prefix is None:
+            self._overflow_timer.start(120)
+        else:
+            # Widths are cached, so re-fitting is a binary search
+            self._evaluate_overflow()
+    
+    def _drop_overflow_menu(self):
+        if self._overflow_menu is not None:
+            self._overflow_menu.deleteLater()
+            self._overflow_menu = None
+    
+    def _invalidate_overflow(self):
+        """Bar contents changed: re-measure and re-apply visibility on the next evaluation"""
+        self._overflow_prefix = None
+        self._overflow_shown = None
+        self._drop_overflow_menu()
+    
+    def _measure_bookmarks(self):
+        """Prefix sums of the bar widgets' widths (plus spacing), measuring only new or retitled widgets"""
+        spacing = self.bookmarks_container_layout.spacing()
+        cache = {}
+        prefix = [0]
+        for _, _, w in self._bookmark_widgets:
+            text = w.text()
+            cached = self._bookmark_width_cache.get(w)
+            if cached is None or cached[0] != text:
+                cached = (text, w.sizeHint().width())
+            cache[w] = cached
+            prefix.append(prefix[-1] + cached[1] + spacing)
+        self._bookmark_width_cache = cache
+        self._overflow_prefix = prefix
 
     def _evaluate_overflow(self):
+        if self._overflow_prefix is None:
+            self._measure_bookmarks()
         available = self.bookmarks_bar_widget.width() - 80
-        total = 0
-        widgets = []
-
-        for i in range(self.bookmarks_container_layout.count()):
-            it = self.bookmarks_container_layout.itemAt(i)
-            w = it.widget()
-            if w is None:
-                continue
-            if isinstance(w, QWidget) and w.sizePolicy().horizontalPolicy() == QSizePolicy.Policy.Expanding:
-                break
-            w.adjustSize()
-            w_w = w.width() if w.width() > 0 else w.sizeHint().width()
-            widgets.append((w, w_w))
-            total += w_w + self.bookmarks_container_layout.spacing()
-
-        if total <= available:
-            for w, _ in widgets:
-                w.setVisible(True)
-            self.overflow_items = []
-            self.overflow_btn.setVisible(False)
+        shown = bisect_right(self._overflow_prefix, available) - 1
+        if shown == self._overflow_shown:
             return
 
-        used = 0
-        shown = []
-        overflow = []
-        for w, w_w in widgets:
-            if used + w_w + self.bookmarks_container_layout.spacing() <= available:
-                shown.append(w)
-                used += w_w + self.bookmarks_container_layout.spacing()
-            else:
-                overflow.append(w)
-
-        for w, _ in widgets:
-            w.setVisible(w in shown)
-
-        self.overflow_items = []
-        for w in overflow:
-            if isinstance(w, QToolButton):
-                self.overflow_items.append({"type": "folder", "title": w.text(), "menu": w.menu()})
-            elif isinstance(w, QPushButton):
-                self.overflow_items.append({"type": "link", "title": w.text(), "href": w.property("href")})
-
-        self.overflow_btn.setVisible(bool(self.overflow_items))
+        widgets = self._bookmark_widgets
+        if self._overflow_shown is None:
+            for i, (_, _, w) in enumerate(widgets):
+                w.setVisible(i < shown)
+        else:
+            # Only the widgets between the old and new cut-off change state
+            lo, hi = sorted((shown, self._overflow_shown))
+            for _, _, w in widgets[lo:hi]:
+                w.setVisible(shown == hi)
+        self._overflow_shown = shown
+        self._drop_overflow_menu()
+        self.overflow_btn.setVisible(shown < len(widgets))
 
     def show_overflow_menu(self):
-        if not self.overflow_items:
+        shown = self._overflow_shown
+        if shown is None or shown >= len(self._bookmark_widgets):
             return
-        menu = QMenu()
-        for it in self.overflow_items:
-            if it["type"] == "link":
-                act = QAction(it["title"], self)
-                h = it.get("href")
-                act.triggered.connect(lambda checked, href=h: self._open_href(href))
-                menu.addAction(act)
-            elif it["type"] == "folder":
-                sub = QMenu(it["title"], self)
-                src_menu = it.get("menu")
-
-                def clone_menu(src, dst):
-                    for a in src.actions():
-                        if a.menu():
-                            child = QMenu(a.text(), self)
-                            clone_menu(a.menu(), child)
-                            dst.addMenu(child)
-                        else:
-                            new = QAction(a.text(), self)
-                            new.triggered.connect(lambda checked, t=a.text(): self._open_href(self._find_href_by_title(t)))
-                            dst.addAction(new)
-
-                if src_menu:
-                    clone_menu(src_menu, sub)
-                menu.addMenu(sub)
-        menu.exec(self.overflow_btn.mapToGlobal(self.overflow_btn.rect().bottomLeft()))
-
-    def _find_href_by_title(self, title):
-        queue = list(self.bookmarks)
-        while queue:
-            node = queue.pop(0)
-            if node["type"] == "link" and node.get("title") == title:
-                return node.get("href")
-            if node["type"] == "folder":
-                queue = node.get("children", []) + queue
-        return ""
+        if self._overflow_menu is None:
+            # Built once per layout; folder entries share the buttons' lazy menus
+            menu = QMenu(self)
+            for _, node, w in self._bookmark_widgets[shown:]:
+                if node["type"] == "link":
+                    menu.addAction(self._make_bookmark_action(node, menu))
+                elif node["type"] == "folder" and w.menu() is not None:
+                    menu.addMenu(w.menu())
+            self._overflow_menu = menu
+        self._overflow_menu.exec(self.overflow_btn.mapToGlobal(self.overflow_btn.rect().bottomLeft()))
 
     # ------------------------
     # Navigation & downloads
@@ -950,15 +3662,74 @@ class Browser(QMainWindow):
             item.setDownloadFileName(os.path.basename(path))
             item.accept()
 
+    # ------------------------
+    # Element hiding
+    # ------------------------
+    def _install_generic_css(self):
+        """Install the generic hiding stylesheet once, profile-wide"""
+        scripts = self.profile.scripts()
+        for script in scripts.find(GENERIC_CSS_SCRIPT):
+            scripts.remove(script)
+        filters = self.ad_blocker.filters
+        if filters is not None and filters.generic_css:
+            scripts.insert(hide_css_script(GENERIC_CSS_SCRIPT, filters.generic_css))
+    
+    def apply_site_css(self, page, url):
+        filters = self.ad_blocker.filters
+        if filters is None or not self.ad_blocker.enabled:
+            page.set_site_css("")
+            return
+        page.set_site_css(filters.site_css(url.host().lower()))
+    
+    # ------------------------
+    # Ad blocker stats
+    # ------------------------
+    def dump_adblock_stats(self, path=None):
+        """Write ad blocker counters and latency histogram as JSON; returns the path"""
+        path = path or ADBLOCK_STATS_FILE
+        tabs = []
+        for i in range(self.tabs.count()):
+            widget = self.tabs.widget(i)
+            if widget:
+                page_id = widget.page().ad_page_id if isinstance(widget, BrowserTab) else None
+                tabs.append((widget.title(), widget.url().toString(), page_id))
+        data = self.ad_blocker.stats_snapshot(tabs)
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=2)
+        except OSError as e:
+            print(f"[AdBlock] Failed to write stats: {e}")
+            return None
+        return path
+    
+    def _on_dump_adblock_stats(self):
+        path = self.dump_adblock_stats()
+        if path:
+            QMessageBox.information(self, "Ad Blocker Stats", f"Statistics saved to:\n{path}")
+        else:
+            QMessageBox.warning(self, "Ad Blocker Stats", "Failed to save statistics.")
+    
+    def moveEvent(self, event):
+        super().moveEvent(event)
+        self.config_store.save()
+    
     def closeEvent(self, event):
+        if self._import_worker is not None:
+            worker = self._import_worker
+            self._cancel_bookmarks_import()
+            worker.wait(2000)
+        self.bookmark_store.wait()
         self._save_config()
         
         # Close all tabs
         for i in range(self.tabs.count()):
             widget = self.tabs.widget(i)
-            if widget:
+            if isinstance(widget, BrowserTab):
                 widget.stop()
                 widget.load(QUrl("about:blank"))
+        self.tab_pool.drain()
+        self.cache_manager.release()
         
         super().closeEvent(event)
 
@@ -1086,7 +3857,7 @@ class CredentialsManager:
     
     def __init__(self):
         self.credentials = {}
-        self._load()
+        self._loaded = False  # decrypting every entry is deferred to the first lookup
     
     def _encrypt(self, text):
         """Encrypt using Windows DPAPI (Data Protection API)"""
@@ -1097,6 +3868,7 @@ class CredentialsManager:
         
         try:
             import base64
+            from ctypes import wintypes
             
             # DPAPI structures
             class DATA_BLOB(ctypes.Structure):
@@ -1143,6 +3915,7 @@ class CredentialsManager:
         
         try:
             import base64
+            from ctypes import wintypes
             
             class DATA_BLOB(ctypes.Structure):
                 _fields_ = [("cbData", wintypes.DWORD), ("pbData", ctypes.POINTER(ctypes.c_char))]
@@ -1185,6 +3958,9 @@ class CredentialsManager:
     
     def _load(self):
         """Load credentials from file"""
+        if self._loaded:
+            return
+        self._loaded = True
         if not os.path.exists(CREDENTIALS_FILE):
             return
         try:
@@ -1216,12 +3992,14 @@ class CredentialsManager:
     def save_credentials(self, domain, username, password):
         """Save credentials for a domain"""
         if username and password:
+            self._load()
             self.credentials[domain] = {'username': username, 'password': password}
             self._save()
             print(f"[Credentials] Saved for {domain}")
     
     def get_credentials(self, domain):
         """Get credentials for a domain"""
+        self._load()
         return self.credentials.get(domain)
     
     def get_domain_from_url(self, url):
@@ -1235,23 +4013,42 @@ class CredentialsManager:
 if __name__ == "__main__":
     print("[DEBUG] Starting...")
     try:
+        parser = argparse.ArgumentParser(description="Gorstak's Browser")
+        parser.add_argument("--adblock-stats", metavar="PATH",
+                            help="write ad blocker statistics as JSON to PATH on exit")
+        parser.add_argument("--perf-profile", choices=sorted(PERFORMANCE_PROFILES),
+                            help="renderer process model and memory budget (overrides the config)")
+        parser.add_argument("--startup-profile", action="store_true",
+                            help="log a timestamp for each startup phase up to the first paint")
+        args, qt_args = parser.parse_known_args()
+        if args.startup_profile:
+            STARTUP.enable()
+        
+        # Chromium reads its flags once, when QApplication starts the web engine
+        perf_profile = args.perf_profile or configured_performance_profile()
+        apply_chromium_flags(perf_profile)
         
         print("[DEBUG] Creating QApplication...")
-        app = QApplication(sys.argv)
+        app = QApplication(sys.argv[:1] + qt_args)
         print("[DEBUG] QApplication created")
+        STARTUP.mark("QApplication created")
         app.setApplicationName("Gorstak's Browser")
         print("[DEBUG] Creating Browser window...")
-        win = Browser()
+        win = Browser(performance_profile=perf_profile)
         print("[DEBUG] Browser created, showing...")
         win.show()
+        STARTUP.mark("window shown")
         
         dll_protection = DLLProtection()
-        QTimer.singleShot(2000, dll_protection.start)  # Start after 2 seconds
+        # Start 2 seconds after the first frame, once lazy DLLs have settled
+        win.first_painted.connect(lambda: QTimer.singleShot(2000, dll_protection.start))
         
         print("[DEBUG] Entering event loop...")
         exit_code = app.exec()
         
         dll_protection.stop()
+        if args.adblock_stats:
+            win.dump_adblock_stats(args.adblock_stats)
         
         sys.exit(exit_code)
     except Exception as e:
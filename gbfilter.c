@@ -0,0 +1,410 @@
+/*
+ * gbfilter.c - optional native request matcher for GBrowser's AdBlocker.
+ *
+ * Answers the filter-list part of a blocking decision (host tables, then the
+ * token-bucketed URL rules and their @@ exceptions) straight from the mapped
+ * filter index (filters.idx, written by write_filter_cache in GBrowser.py).
+ * Nothing is copied: the tables are read in place from the caller's mapping.
+ * GBrowser calls it through ctypes.CDLL, which releases the GIL for the
+ * duration of each call, so matching does not hold up the GUI thread.
+ *
+ * Build, then place the library next to GBrowser.py or in ~/.gorstak_browser:
+ *   Linux:   cc -O2 -shared -fPIC -o gbfilter.so gbfilter.c
+ *   macOS:   cc -O2 -shared -o gbfilter.dylib gbfilter.c
+ *   Windows: cl /O2 /LD gbfilter.c /Fe:gbfilter.dll
+ *
+ * If the library is missing, GBrowser falls back to the pure-Python matcher.
+ */
+
+#include <stdint.h>
+#include <stdlib.h>
+#include <string.h>
+
+#ifdef _WIN32
+#define GBF_EXPORT __declspec(dllexport)
+#else
+#define GBF_EXPORT __attribute__((visibility("default")))
+#endif
+
+#define GBF_ABI_VERSION 2
+#define GBF_MAX_TOKENS 64
+
+/* Sorted string table: u32 count, (count + 1) u32 end offsets, entries blob */
+typedef struct {
+    uint32_t count;
+    const unsigned char *offsets;
+    const unsigned char *blob;
+} gbf_table;
+
+/* Section order matches the `sections` array passed to gbf_open */
+enum { BLOCK_HOSTS, ALLOW_HOSTS, BLOCK_RULES, ALLOW_RULES, TABLE_COUNT };
+
+typedef struct {
+    gbf_table tables[TABLE_COUNT];
+} gbf_index;
+
+typedef struct {
+    const char *s;
+    size_t len;
+} gbf_str;
+
+static uint32_t read_u32(const unsigned char *p)
+{
+    return (uint32_t)p[0] | ((uint32_t)p[1] << 8) | ((uint32_t)p[2] << 16) | ((uint32_t)p[3] << 24);
+}
+
+static int table_init(gbf_table *t, const unsigned char *data, size_t size, size_t offset)
+{
+    size_t blob_start;
+    uint32_t i, prev = 0;
+
+    if (offset > size || size - offset < 4)
+        return 0;
+    t->count = read_u32(data + offset);
+    if ((size - offset - 4) / 4 < (size_t)t->count + 1)
+        return 0;
+    t->offsets = data + offset + 4;
+    t->blob = t->offsets + 4 * ((size_t)t->count + 1);
+    blob_start = (size_t)(t->blob - data);
+    /* Checked once here so lookups can trust every offset */
+    for (i = 0; i <= t->count; i++) {
+        uint32_t end = read_u32(t->offsets + 4 * (size_t)i);
+        if (end < prev || end > size - blob_start)
+            return 0;
+        prev = end;
+    }
+    return 1;
+}
+
+static gbf_str table_entry(const gbf_table *t, uint32_t i)
+{
+    gbf_str entry;
+    uint32_t start = read_u32(t->offsets + 4 * (size_t)i);
+    uint32_t end = read_u32(t->offsets + 4 * (size_t)i + 4);
+
+    entry.s = (const char *)t->blob + start;
+    entry.len = end - start;
+    return entry;
+}
+
+/* First entry >= key; same ordering as Python's sorted(bytes) */
+static uint32_t table_bisect(const gbf_table *t, const char *key, size_t len)
+{
+    uint32_t lo = 0, hi = t->count;
+
+    while (lo < hi) {
+        uint32_t mid = lo + (hi - lo) / 2;
+        gbf_str entry = table_entry(t, mid);
+        int cmp = memcmp(entry.s, key, entry.len < len ? entry.len : len);
+
+        if (cmp == 0)
+            cmp = (entry.len > len) - (entry.len < len);
+        if (cmp < 0)
+            lo = mid + 1;
+        else
+            hi = mid;
+    }
+    return lo;
+}
+
+/* True if host or any of its parent domains is in the table */
+static int table_match_suffix(const gbf_table *t, const char *host, size_t len)
+{
+    while (len) {
+        const char *dot;
+        uint32_t i = table_bisect(t, host, len);
+
+        if (i < t->count) {
+            gbf_str entry = table_entry(t, i);
+            if (entry.len == len && memcmp(entry.s, host, len) == 0)
+                return 1;
+        }
+        dot = memchr(host, '.', len);
+        if (!dot)
+            return 0;
+        len -= (size_t)(dot - host) + 1;
+        host = dot + 1;
+    }
+    return 0;
+}
+
+/* _host_in_domains over a comma-separated domain list */
+static int host_in_domains(const char *host, size_t host_len, const char *list, size_t list_len)
+{
+    const char *end = list + list_len;
+
+    while (list < end) {
+        const char *comma = memchr(list, ',', (size_t)(end - list));
+        size_t len = (size_t)((comma ? comma : end) - list);
+
+        if (len && host_len >= len && memcmp(host + host_len - len, list, len) == 0
+                && (host_len == len || host[host_len - len - 1] == '.'))
+            return 1;
+        list += len + 1;
+    }
+    return 0;
+}
+
+/* ABP "^": anything but a letter, digit or one of _-.%, or the end of the URL.
+ * Non-ASCII bytes count as letters; GBrowser only passes ASCII URLs. */
+static int is_separator(unsigned char c)
+{
+    if ((c >= 'a' && c <= 'z') || (c >= 'A' && c <= 'Z') || (c >= '0' && c <= '9') || c >= 0x80)
+        return 0;
+    return c != '_' && c != '-' && c != '.' && c != '%';
+}
+
+/* Match p..pe (with * and ^) at the start of s..se, to the end of s if anchored */
+static int glob_match(const char *p, const char *pe, const char *s, const char *se, int anchored_end)
+{
+    const char *star_p = NULL, *star_s = NULL;
+
+    for (;;) {
+        if (p < pe && *p == '*') {
+            star_p = ++p;
+            star_s = s;
+            continue;
+        }
+        if (p == pe) {
+            if (!anchored_end || s == se)
+                return 1;
+        } else if (s < se && (*p == '^' ? is_separator((unsigned char)*s) : *p == *s)) {
+            p++;
+            s++;
+            continue;
+        } else if (s == se && *p == '^') {
+            p++;
+            continue;
+        }
+        if (!star_p || star_s >= se)
+            return 0;
+        p = star_p;
+        s = ++star_s;
+    }
+}
+
+static int is_scheme_char(char c)
+{
+    return (c >= 'a' && c <= 'z') || (c >= '0' && c <= '9') || c == '+' || c == '.' || c == '-';
+}
+
+/* Same semantics as the regex from _abp_pattern_to_regex (URL and pattern are lowercase) */
+static int pattern_match(const char *p, size_t plen, const char *url, size_t url_len)
+{
+    const char *pe = p + plen, *se = url + url_len;
+    int domain_anchor = 0, start_anchor = 0, end_anchor = 0;
+    size_t i;
+
+    if (plen >= 2 && p[0] == '|' && p[1] == '|') {
+        domain_anchor = 1;
+        p += 2;
+    } else if (plen >= 1 && p[0] == '|') {
+        start_anchor = 1;
+        p++;
+    }
+    if (pe > p && pe[-1] == '|') {
+        end_anchor = 1;
+        pe--;
+    }
+
+    if (start_anchor)
+        return glob_match(p, pe, url, se, end_anchor);
+    if (domain_anchor) {
+        /* scheme "://", then the host or any of its parent domains */
+        if (!url_len || url[0] < 'a' || url[0] > 'z')
+            return 0;
+        for (i = 1; i < url_len && is_scheme_char(url[i]); i++)
+            ;
+        if (url_len - i < 3 || memcmp(url + i, "://", 3) != 0)
+            return 0;
+        i += 3;
+        if (glob_match(p, pe, url + i, se, end_anchor))
+            return 1;
+        for (; i < url_len && url[i] != '/' && url[i] != '?' && url[i] != '#'; i++) {
+            if (url[i] == '.' && glob_match(p, pe, url + i + 1, se, end_anchor))
+                return 1;
+        }
+        return 0;
+    }
+    for (i = 0; i <= url_len; i++) {
+        if (glob_match(p, pe, url + i, se, end_anchor))
+            return 1;
+    }
+    return 0;
+}
+
+/* Rule entries are `token NUL fields NUL rule-text`, fields being
+ * `party TAB type-mask TAB include-domains TAB exclude-domains TAB pattern`.
+ * Returns 1 on a match, 0 if the rule does not apply, -1 if it might but is
+ * a /regex/ rule, which is left to Python. */
+static int rule_matches(gbf_str entry, size_t key_len, const char *url, size_t url_len,
+                        const char *fp_host, size_t fp_len, int third_party, uint32_t type_bit)
+{
+    const char *field = entry.s + key_len, *end, *fields[5];
+    size_t lens[5];
+    uint32_t mask = 0;
+    size_t i, n;
+
+    end = memchr(field, '\0', entry.len - key_len);
+    if (!end)
+        return 0;
+    for (n = 0; n < 5; n++) {
+        const char *tab = n < 4 ? memchr(field, '\t', (size_t)(end - field)) : NULL;
+        const char *stop = tab ? tab : end;
+
+        if (n < 4 && !tab)
+            return 0;
+        fields[n] = field;
+        lens[n] = (size_t)(stop - field);
+        field = stop + 1;
+    }
+
+    for (i = 0; i < lens[1]; i++) {
+        if (fields[1][i] < '0' || fields[1][i] > '9')
+            return 0;
+        mask = mask * 10 + (uint32_t)(fields[1][i] - '0');
+    }
+    if (!(mask & type_bit))
+        return 0;
+    if (lens[0] == 1 && ((fields[0][0] == '3' && !third_party) || (fields[0][0] == '1' && third_party)))
+        return 0;
+    if (lens[2] && !host_in_domains(fp_host, fp_len, fields[2], lens[2]))
+        return 0;
+    if (lens[3] && host_in_domains(fp_host, fp_len, fields[3], lens[3]))
+        return 0;
+    if (lens[4] > 2 && fields[4][0] == '/' && fields[4][lens[4] - 1] == '/')
+        return -1;
+    return pattern_match(fields[4], lens[4], url, url_len);
+}
+
+static int is_token_char(char c)
+{
+    return (c >= 'a' && c <= 'z') || (c >= '0' && c <= '9') || c == '%';
+}
+
+/* FilterSet._match_rules: the "" bucket plus one bucket per URL token */
+static int scan_rules(const gbf_table *t, const char *url, size_t url_len,
+                      const char *fp_host, size_t fp_len, int third_party, uint32_t type_bit)
+{
+    gbf_str tokens[GBF_MAX_TOKENS + 1];
+    size_t n_tokens = 1, i = 0, k;
+    int result = 0;
+
+    tokens[0].s = "";
+    tokens[0].len = 0;
+    while (i < url_len) {
+        size_t start;
+
+        while (i < url_len && !is_token_char(url[i]))
+            i++;
+        start = i;
+        while (i < url_len && is_token_char(url[i]))
+            i++;
+        if (i - start < 3)
+            continue;
+        for (k = 1; k < n_tokens; k++) {
+            if (tokens[k].len == i - start && memcmp(tokens[k].s, url + start, i - start) == 0)
+                break;
+        }
+        if (k < n_tokens)
+            continue;
+        if (n_tokens > GBF_MAX_TOKENS)
+            return -1;  /* unusually many tokens: let Python handle it */
+        tokens[n_tokens].s = url + start;
+        tokens[n_tokens].len = i - start;
+        n_tokens++;
+    }
+
+    for (k = 0; k < n_tokens; k++) {
+        char buf[256], *key = buf;
+        size_t key_len = tokens[k].len + 1;
+        uint32_t j;
+        int match = 0;
+
+        if (key_len > sizeof(buf) && !(key = (char *)malloc(key_len)))
+            return -1;
+        memcpy(key, tokens[k].s, tokens[k].len);
+        key[tokens[k].len] = '\0';
+        for (j = table_bisect(t, key, key_len); j < t->count; j++) {
+            gbf_str entry = table_entry(t, j);
+
+            if (entry.len < key_len || memcmp(entry.s, key, key_len) != 0)
+                break;
+            match = rule_matches(entry, key_len, url, url_len, fp_host, fp_len, third_party, type_bit);
+            if (match > 0)
+                break;
+            if (match < 0)
+                result = -1;
+        }
+        if (key != buf)
+            free(key);
+        if (match > 0)
+            return 1;
+    }
+    return result;
+}
+
+GBF_EXPORT int gbf_abi_version(void)
+{
+    return GBF_ABI_VERSION;
+}
+
+/* data/size: the whole mapped index; sections: absolute offsets of the
+ * block_hosts, allow_hosts, block_rules and allow_rules tables */
+GBF_EXPORT void *gbf_open(const unsigned char *data, size_t size, const uint64_t *sections)
+{
+    gbf_index *index;
+    int i;
+
+    if (!data || size < 12 || memcmp(data, "GBFI", 4) != 0)
+        return NULL;
+    index = (gbf_index *)calloc(1, sizeof(*index));
+    if (!index)
+        return NULL;
+    for (i = 0; i < TABLE_COUNT; i++) {
+        if (sections[i] > size || !table_init(&index->tables[i], data, size, (size_t)sections[i])) {
+            free(index);
+            return NULL;
+        }
+    }
+    return index;
+}
+
+GBF_EXPORT void gbf_close(void *handle)
+{
+    free(handle);
+}
+
+/* FilterSet.host_verdict: 1 block, 0 allow, -1 when the host tables have no opinion */
+GBF_EXPORT int gbf_host_verdict(void *handle, const char *host, size_t len)
+{
+    const gbf_index *index = (const gbf_index *)handle;
+
+    if (!len)
+        return -1;
+    if (table_match_suffix(&index->tables[ALLOW_HOSTS], host, len))
+        return 0;
+    if (table_match_suffix(&index->tables[BLOCK_HOSTS], host, len))
+        return 1;
+    return -1;
+}
+
+/* FilterSet.url_verdict: whether a request is blocked once the URL rules are
+ * applied on top of `blocked` (the caller's own verdict so far).
+ * Returns 1 block, 0 allow, -1 if a /regex/ rule has to be checked in Python. */
+GBF_EXPORT int gbf_url_verdict(void *handle, const char *url, size_t url_len,
+                               const char *fp_host, size_t fp_len,
+                               int third_party, uint32_t type_bit, int blocked)
+{
+    const gbf_index *index = (const gbf_index *)handle;
+    int match;
+
+    if (!blocked) {
+        match = scan_rules(&index->tables[BLOCK_RULES], url, url_len, fp_host, fp_len, third_party, type_bit);
+        if (match <= 0)
+            return match;
+    }
+    /* @@ exception rules override any block */
+    match = scan_rules(&index->tables[ALLOW_RULES], url, url_len, fp_host, fp_len, third_party, type_bit);
+    return match < 0 ? -1 : !match;
+}
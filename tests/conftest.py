@@ -0,0 +1,19 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# GBrowser creates its config directory under the home directory at import time
+_HOME = tempfile.mkdtemp(prefix="gbrowser-tests-")
+os.environ["HOME"] = _HOME
+os.environ["USERPROFILE"] = _HOME
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def gb():
+    """The GBrowser module (the tests exercise its pure-Python parts, but it imports PyQt6)"""
+    pytest.importorskip("PyQt6.QtWebEngineCore")
+    import GBrowser
+    return GBrowser
@@ -0,0 +1,135 @@
+import pytest
+
+LIST = """\
+||tracker.example^
+/banner/ads.
+@@/banner/ads.allowed
+||media.example^$image
+||cdn.example/lib.js
+@@||cdn.example/lib.js$domain=friend.example
+/catchall.$other
+"""
+
+
+class FakeRequest:
+    """The parts of QWebEngineUrlRequestInfo that AdBlocker reads"""
+
+    def __init__(self, gb, url, first_party, resource_type="ResourceTypeScript"):
+        self._url = gb.QUrl(url)
+        self._first_party = gb.QUrl(first_party)
+        self._type = getattr(gb.QWebEngineUrlRequestInfo.ResourceType, resource_type)
+        self.blocked = False
+
+    def requestUrl(self):
+        return self._url
+
+    def firstPartyUrl(self):
+        return self._first_party
+
+    def resourceType(self):
+        return self._type
+
+    def block(self, blocked):
+        self.blocked = blocked
+
+
+@pytest.fixture
+def blocker(gb):
+    return gb.AdBlocker()
+
+
+@pytest.fixture
+def filters(gb, tmp_path):
+    path = tmp_path / "list.txt"
+    path.write_text(LIST, encoding="utf-8")
+    return gb.FilterSet.from_compiled(gb.compile_filter_lists([str(path)]))
+
+
+def _blocked(gb, blocker, url, first_party="https://site.example/", resource_type="ResourceTypeScript", page_id=1):
+    request = FakeRequest(gb, url, first_party, resource_type)
+    blocker.filter_request(request, page_id)
+    return request.blocked
+
+
+def test_main_frame_is_never_blocked(gb, blocker, filters):
+    blocker.filters = filters
+    assert not _blocked(gb, blocker, "https://tracker.example/", resource_type="ResourceTypeMainFrame")
+    # Not even looked up
+    assert blocker.cache_hits == blocker.cache_misses == 0
+    assert _blocked(gb, blocker, "https://tracker.example/", resource_type="ResourceTypeSubFrame")
+
+
+def test_builtin_url_patterns_only_apply_cross_site(gb, blocker):
+    # No filter lists loaded yet: built-in hosts and URL patterns only
+    assert _blocked(gb, blocker, "https://cdn.other.example/ads/x.js")
+    assert not _blocked(gb, blocker, "https://cdn.site.example/ads/x.js")
+    assert not _blocked(gb, blocker, "https://site.example/ads/x.js")
+    assert _blocked(gb, blocker, "https://doubleclick.net/x.js", first_party="https://doubleclick.net/")
+
+
+def test_exceptions_override_rule_blocks(gb, blocker, filters):
+    blocker.filters = filters
+    assert _blocked(gb, blocker, "https://site.example/banner/ads.js")
+    assert not _blocked(gb, blocker, "https://site.example/banner/ads.allowed")
+    assert _blocked(gb, blocker, "https://cdn.example/lib.js")
+    assert not _blocked(gb, blocker, "https://cdn.example/lib.js", first_party="https://friend.example/")
+    # Exceptions also lift blocks from the built-in URL patterns
+    assert not _blocked(gb, blocker, "https://x.other.example/banner/ads.allowed")
+    assert _blocked(gb, blocker, "https://x.other.example/banner/ads.js")
+
+
+def test_resource_types_map_to_rule_type_options(gb, blocker, filters):
+    blocker.filters = filters
+    assert _blocked(gb, blocker, "https://media.example/a.png", resource_type="ResourceTypeImage")
+    assert _blocked(gb, blocker, "https://media.example/favicon.ico", resource_type="ResourceTypeFavicon")
+    assert not _blocked(gb, blocker, "https://media.example/a.js", resource_type="ResourceTypeScript")
+    # Types without an ABP equivalent count as "other"
+    assert _blocked(gb, blocker, "https://site.example/catchall.x", resource_type="ResourceTypeUnknown")
+    assert not _blocked(gb, blocker, "https://site.example/catchall.x", resource_type="ResourceTypeScript")
+
+
+def test_disabled_blocker_lets_everything_through(gb, blocker, filters):
+    blocker.filters = filters
+    blocker.enabled = False
+    assert not _blocked(gb, blocker, "https://tracker.example/t.js")
+    assert blocker.stats.requests == 0
+
+
+def test_host_verdict_cache_counters(gb, blocker, filters):
+    blocker.filters = filters
+    blocker.clear_cache()
+    for path in ("a.js", "b.png", "c.css"):
+        _blocked(gb, blocker, "https://x.tracker.example/" + path)
+    _blocked(gb, blocker, "https://other.example/x.js")
+    assert (blocker.cache_misses, blocker.cache_hits) == (2, 2)
+    assert blocker.blocked_count == 3
+
+    blocker.clear_cache()
+    _blocked(gb, blocker, "https://x.tracker.example/a.js")
+    assert blocker.cache_misses == 3
+
+
+def test_stats_are_kept_per_page(gb, blocker, filters):
+    blocker.filters = filters
+    _blocked(gb, blocker, "https://tracker.example/t.js", page_id=1)
+    _blocked(gb, blocker, "https://site.example/app.js", page_id=1)
+    _blocked(gb, blocker, "https://tracker.example/t.js", page_id=2)
+    worker = FakeRequest(gb, "https://tracker.example/sw.js", "https://site.example/", "ResourceTypeServiceWorker")
+    blocker.interceptRequest(worker)
+    assert worker.blocked
+    # Page requests reach interceptRequest only on the profile; it leaves them to the page interceptors
+    page_request = FakeRequest(gb, "https://tracker.example/t.js", "https://site.example/")
+    blocker.interceptRequest(page_request)
+    assert not page_request.blocked
+
+    stats = blocker.stats_snapshot([("One", "https://site.example/", 1), ("Two", "https://b.example/", 2),
+                                    ("New", "about:blank", 3)])
+    assert [(t["title"], t["blocked"], t["allowed"]) for t in stats["tabs"]] == [
+        ("One", 1, 1), ("Two", 1, 0), ("New", 0, 0)]
+    assert stats["workers"] == {"blocked": 1, "allowed": 0}
+    assert stats["domains"]["tracker.example"] == {"blocked": 3, "allowed": 0}
+    assert stats["requests"] == 4
+
+    blocker.stats.forget_page(1)
+    stats = blocker.stats_snapshot([("One", "https://site.example/", 1)])
+    assert stats["tabs"][0]["blocked"] == 0
@@ -0,0 +1,90 @@
+import random
+import re
+
+
+def _tokenize(text):
+    return re.findall(r"\w+", text.lower())
+
+
+def _index(gb, links):
+    nodes = [{"type": "link", "title": title, "href": href} for title, href in links]
+    gb.BookmarkIndex().rebuild(nodes)
+    index = gb.BookmarkSearchIndex()
+    index.add(nodes)
+    return index
+
+
+def _titles(results):
+    return [title for _id, title, _href in results]
+
+
+def test_title_hits_rank_above_url_hits(gb):
+    index = _index(gb, [
+        ("Some page", "https://python.example/"),
+        ("Python docs", "https://docs.example/"),
+        ("Python", "https://www.python.org/"),
+    ])
+    assert _titles(index.search("python")) == ["Python", "Python docs", "Some page"]
+    # URL noise words are not indexed
+    assert index.search("https") == [] and index.search("www") == []
+
+
+def test_every_word_must_match_and_last_word_is_a_prefix(gb):
+    index = _index(gb, [
+        ("Python tutorial", "https://a.example/"),
+        ("Python reference", "https://b.example/"),
+        ("Rust tutorial", "https://c.example/"),
+    ])
+    assert _titles(index.search("python tut")) == ["Python tutorial"]
+    assert _titles(index.search("tut")) == ["Rust tutorial", "Python tutorial"]
+    # Earlier words and one-letter words match whole tokens only
+    assert index.search("pyth tutorial") == []
+    assert index.search("p") == []
+    assert index.search("rust python") == []
+    assert index.search("  ") == []
+
+
+def _reference(links, query, limit):
+    """Brute-force ranking: weight 2 for title, 1 for URL, doubled for exact matches, summed over words"""
+    words = _tokenize(query)
+    scored = []
+    for node_id, (title, href) in enumerate(links, 1):
+        weights = dict.fromkeys(_tokenize(title), 2)
+        for token in _tokenize(href):
+            if token not in ("http", "https", "www"):
+                weights[token] = weights.get(token, 0) | 1
+        total = 0
+        for n, word in enumerate(words):
+            prefix = n == len(words) - 1 and len(word) > 1
+            best = max([w * (2 if t == word else 1) for t, w in weights.items()
+                        if t == word or prefix and t.startswith(word)] or [0])
+            if not best:
+                break
+            total += best
+        else:
+            scored.append((-total, len(title), node_id))
+    return [node_id for _score, _length, node_id in sorted(scored)[:limit]]
+
+
+def test_ranking_matches_a_full_scan(gb):
+    rng = random.Random(42)
+    words = ["alpha", "alps", "beta", "bet", "gamma", "game", "delta", "del", "news", "new"]
+    links = []
+    for _ in range(600):
+        title = " ".join(rng.choice(words) for _ in range(rng.randint(1, 3)))
+        href = "https://%s.example/%s" % (rng.choice(words), rng.choice(words))
+        links.append((title, href))
+    index = _index(gb, links)
+    assert any(len(ids) >= index.PRERANK_MIN for ids in index._postings.values())
+    for query in ["alp", "alpha", "bet", "ga", "new", "alpha bet", "game del", "news alps be", "beta beta"]:
+        expected = _reference(links, query, 10)
+        assert [i for i, _title, _href in index.search(query, limit=10)] == expected, query
+
+
+def test_added_links_are_searchable_right_away(gb):
+    index = _index(gb, [("First", "https://first.example/")])
+    assert _titles(index.search("sec")) == []
+    nodes = [{"type": "link", "id": 50, "title": "Second", "href": "https://second.example/"},
+             {"type": "folder", "id": 51, "title": "Second folder", "children": []}]
+    index.add(nodes)
+    assert _titles(index.search("sec")) == ["Second"]
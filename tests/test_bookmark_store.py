@@ -0,0 +1,113 @@
+import copy
+import types
+
+import pytest
+
+TREE = [
+    {"type": "link", "title": "One", "href": "https://one.example/"},
+    {"type": "folder", "title": "News", "children": [
+        {"type": "link", "title": "Daily", "href": "https://daily.example/"},
+        {"type": "folder", "title": "Empty", "children": []},
+    ]},
+    {"type": "link", "title": "Two", "href": "https://two.example/"},
+]
+
+
+def _plain(nodes):
+    """Tree without ids or StoredFolder laziness, for comparing with TREE"""
+    out = []
+    for node in nodes:
+        if node["type"] == "folder":
+            out.append({"type": "folder", "title": node["title"], "children": _plain(node["children"])})
+        else:
+            out.append({"type": "link", "title": node["title"], "href": node["href"]})
+    return out
+
+
+@pytest.fixture
+def store(gb, tmp_path):
+    return gb.BookmarkStore(str(tmp_path / "bookmarks.db"))
+
+
+def test_round_trip_with_lazy_folders(gb, store):
+    roots = copy.deepcopy(TREE)
+    gb.BookmarkIndex().rebuild(roots)
+    assert store.is_empty()
+    assert store.replace_all(roots, wait=True)
+
+    loaded = store.load_roots()
+    folder = loaded[1]
+    assert isinstance(folder, gb.StoredFolder)
+    assert not folder.loaded
+    assert [n["id"] for n in loaded] == [n["id"] for n in roots]
+    assert _plain(loaded) == TREE
+    assert folder.loaded
+    assert store.max_id() == 5
+    assert sorted(n["href"] for n in store.read_links()) == [
+        "https://daily.example/", "https://one.example/", "https://two.example/"]
+
+
+def test_unopened_folders_survive_a_rewrite(gb, store):
+    roots = copy.deepcopy(TREE)
+    gb.BookmarkIndex().rebuild(roots)
+    store.replace_all(roots, wait=True)
+
+    loaded = store.load_roots()
+    loaded.append({"type": "link", "id": 9, "title": "Three", "href": "https://three.example/"})
+    # The News folder was never opened, so its rows are written back as they were
+    store.replace_all(loaded)
+    store.wait()
+    assert _plain(store.load_roots()) == TREE + [
+        {"type": "link", "title": "Three", "href": "https://three.example/"}]
+
+
+def _browser(gb, store, config):
+    saved = []
+    shown = []
+    browser = types.SimpleNamespace(
+        config=config,
+        bookmark_store=store,
+        bookmark_index=gb.BookmarkIndex(),
+        config_store=types.SimpleNamespace(save=lambda: saved.append(dict(config))),
+        _set_bookmarks=shown.append,
+    )
+    gb.Browser.__dict__["_load_bookmarks_bar"](browser)
+    return saved, shown
+
+
+def test_legacy_bookmarks_move_to_the_store(gb, store):
+    config = {"bookmarks": copy.deepcopy(TREE), "home": "x"}
+    saved, shown = _browser(gb, store, config)
+    assert config == {"home": "x"}
+    assert saved == [{"home": "x"}]
+    assert _plain(shown[0]) == TREE
+    assert _plain(store.load_roots()) == TREE
+
+
+def test_legacy_bookmarks_stay_when_the_store_is_unavailable(gb, tmp_path):
+    store = gb.BookmarkStore(str(tmp_path))  # a directory cannot be opened as a database
+    assert store.conn is None
+    config = {"bookmarks": copy.deepcopy(TREE)}
+    saved, shown = _browser(gb, store, config)
+    assert _plain(config["bookmarks"]) == TREE
+    assert saved == []
+    assert shown == [config["bookmarks"]]
+
+
+def test_legacy_bookmarks_stay_when_the_write_fails(gb, store, monkeypatch):
+    monkeypatch.setattr(store, "_write", lambda rows: False)
+    config = {"bookmarks": copy.deepcopy(TREE)}
+    saved, shown = _browser(gb, store, config)
+    assert _plain(config["bookmarks"]) == TREE
+    assert saved == []
+    assert shown == [config["bookmarks"]]
+
+
+def test_store_wins_over_a_stale_legacy_copy(gb, store):
+    roots = copy.deepcopy(TREE[:1])
+    gb.BookmarkIndex().rebuild(roots)
+    store.replace_all(roots, wait=True)
+    config = {"bookmarks": copy.deepcopy(TREE)}
+    saved, shown = _browser(gb, store, config)
+    assert "bookmarks" not in config
+    assert _plain(shown[0]) == TREE[:1]
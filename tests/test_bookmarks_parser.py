@@ -0,0 +1,113 @@
+import random
+
+import pytest
+
+EXPORT = """<!DOCTYPE NETSCAPE-Bookmark-file-1>
+<META HTTP-EQUIV="Content-Type" CONTENT="text/html; charset=UTF-8">
+<TITLE>Bookmarks</TITLE>
+<H1>Bookmarks</H1>
+<DL><p>
+    <DT><H3>Bookmarks bar</H3>
+    <DL><p>
+        <DT><A HREF="https://one.example/">One &amp; only</A>
+        <DT><H3>News</H3>
+        <DL><p>
+            <DT><A HREF="https://news.example/">News</A>
+            <DT><H3>Empty</H3>
+            <DL><p>
+            </DL><p>
+        </DL><p>
+        <DT><A HREF="https://two.example/"></A>
+    </DL><p>
+</DL><p>
+"""
+
+TWO_ROOTS = """<DL><p>
+    <DT><H3>Work</H3>
+    <DL><p>
+        <DT><A HREF="https://work.example/">Work</A>
+    </DL><p>
+    <DT><A HREF="https://loose.example/">Loose</A>
+    <DT><H3>Home</H3>
+    <DL><p>
+        <DT><A HREF="https://home.example/">Home</A>
+    </DL><p>
+</DL><p>
+"""
+
+
+def _stream(gb, html, chunk_sizes):
+    """Feed html in chunks the way BookmarkImportWorker does; returns (streamed, result)"""
+    parser = gb.BookmarksHTMLParser()
+    streamed = []
+    pos = 0
+    while pos < len(html):
+        size = next(chunk_sizes)
+        parser.feed(html[pos:pos + size])
+        pos += size
+        batch = parser.take_completed()
+        if parser.restarted:
+            parser.restarted = False
+            streamed = []
+        streamed.extend(batch)
+    parser.close()
+    result = parser.result()
+    streamed.extend(parser.take_completed())
+    return streamed, result
+
+
+def test_parse_unwraps_export_folder(gb):
+    roots = gb.parse_bookmarks_html(EXPORT)
+    assert [n["type"] for n in roots] == ["link", "folder", "link"]
+    assert roots[0] == {"type": "link", "title": "One & only", "href": "https://one.example/"}
+    news = roots[1]
+    assert news["title"] == "News"
+    assert [c["title"] for c in news["children"]] == ["News", "Empty"]
+    assert news["children"][1]["children"] == []
+    # A link without text falls back to its URL
+    assert roots[2]["title"] == "https://two.example/"
+
+
+def test_parse_keeps_several_top_level_nodes(gb):
+    roots = gb.parse_bookmarks_html(TWO_ROOTS)
+    assert [n["title"] for n in roots] == ["Work", "Loose", "Home"]
+    assert roots[2]["children"][0]["href"] == "https://home.example/"
+
+
+def test_parse_without_lists_returns_flat_links(gb):
+    html = '<A HREF="https://a.example/">A</A><p><A HREF="https://b.example/">B</A><A>no href</A>'
+    assert [n["href"] for n in gb.parse_bookmarks_html(html)] == [
+        "https://a.example/", "https://b.example/"]
+
+
+@pytest.mark.parametrize("html", [EXPORT, TWO_ROOTS], ids=["wrapped", "two-roots"])
+def test_streamed_nodes_match_result(gb, html):
+    rng = random.Random(1234)
+    expected = gb.parse_bookmarks_html(html)
+    for size in (1, 7, 64, len(html)):
+        streamed, result = _stream(gb, html, iter(lambda: size, None))
+        assert result == expected
+        assert streamed == expected
+    for _ in range(50):
+        streamed, result = _stream(gb, html, iter(lambda: rng.randint(1, 40), None))
+        assert streamed == expected
+
+
+def test_wrapped_export_streams_before_the_end(gb):
+    links = "".join('<DT><A HREF="https://site%d.example/">Site %d</A>\n' % (i, i) for i in range(1000))
+    html = "<DL><p><DT><H3>Bookmarks bar</H3><DL><p>\n" + links + "</DL><p></DL><p>\n"
+    parser = gb.BookmarksHTMLParser()
+    parser.feed(html[:len(html) // 2])
+    # The lone wrapper folder is still open, but its finished children are already out
+    assert len(parser.take_completed()) > 400
+    assert not parser.restarted
+
+
+def test_second_top_level_node_restarts_streaming(gb):
+    parser = gb.BookmarksHTMLParser()
+    split = TWO_ROOTS.index("<DT><A HREF=\"https://loose")
+    parser.feed(TWO_ROOTS[:split])
+    assert [n["href"] for n in parser.take_completed()] == ["https://work.example/"]
+    parser.feed(TWO_ROOTS[split:])
+    assert parser.restarted
+    assert [n["title"] for n in parser.take_completed()][:2] == ["Work", "Loose"]
@@ -0,0 +1,134 @@
+import json
+import os
+
+import pytest
+
+LOCKS = ["storage/lockfile", "cache/lockfile"]
+
+
+def _touch(root, name, size=0, mtime=None):
+    path = os.path.join(root, *name.split("/"))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(b"\0" * size)
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+    return path
+
+
+@pytest.fixture
+def config_dir(tmp_path):
+    root = str(tmp_path / "profile")
+    for name in LOCKS + ["storage/GPUCache/data_0", "storage/Cache/index"]:
+        _touch(root, name)
+    return root
+
+
+def _write_pid(gb, config_dir, pid):
+    with open(os.path.join(config_dir, os.path.basename(gb.CACHE_PID_FILE)), "w") as f:
+        f.write(str(pid))
+
+
+def _write_purge(gb, config_dir, names):
+    with open(os.path.join(config_dir, os.path.basename(gb.CACHE_PURGE_FILE)), "w") as f:
+        json.dump(names, f)
+
+
+def _exists(config_dir, name):
+    return os.path.lexists(os.path.join(config_dir, *name.split("/")))
+
+
+def test_pid_alive(gb):
+    assert gb.pid_alive(os.getpid())
+    assert not gb.pid_alive(0)
+
+
+def test_live_owner_skips_cleanup(gb, config_dir, monkeypatch):
+    monkeypatch.setattr(gb, "pid_alive", lambda pid: pid == 4242)
+    _write_pid(gb, config_dir, 4242)
+    _write_purge(gb, config_dir, ["storage/Cache"])
+
+    manager = gb.CacheManager(config_dir).startup()
+    assert not manager.owner
+    assert all(_exists(config_dir, lock) for lock in LOCKS)
+    assert _exists(config_dir, "storage/Cache") and _exists(config_dir, "storage/GPUCache")
+    # The other instance's pid file and pending purge are left for it
+    manager.release()
+    assert _exists(config_dir, os.path.basename(gb.CACHE_PID_FILE))
+    assert _exists(config_dir, os.path.basename(gb.CACHE_PURGE_FILE))
+
+
+def test_dead_owner_locks_and_gpu_cache_are_removed(gb, config_dir, monkeypatch):
+    monkeypatch.setattr(gb, "pid_alive", lambda pid: False)
+    _write_pid(gb, config_dir, 4242)
+
+    manager = gb.CacheManager(config_dir).startup()
+    assert manager.owner and manager.unclean
+    assert not any(_exists(config_dir, lock) for lock in LOCKS)
+    assert not _exists(config_dir, "storage/GPUCache")
+    assert _exists(config_dir, "storage/Cache")
+    with open(manager.pid_file) as f:
+        assert f.read() == str(os.getpid())
+    manager.release()
+    assert not os.path.exists(manager.pid_file)
+
+
+def test_clean_previous_shutdown_keeps_everything(gb, config_dir):
+    manager = gb.CacheManager(config_dir).startup()
+    assert manager.owner and not manager.unclean
+    assert all(_exists(config_dir, lock) for lock in LOCKS)
+    assert _exists(config_dir, "storage/GPUCache")
+
+
+def test_scan_evicts_least_recently_used_units_over_quota(gb, config_dir):
+    unit = 400 * 1024
+    for name, mtime in [("old", 2000), ("older", 1000), ("newest", 4000), ("new", 3000)]:
+        path = _touch(config_dir, "storage/IndexedDB/%s/data" % name, unit, mtime)
+        os.utime(os.path.dirname(path), (mtime, mtime))
+    manager = gb.CacheManager(config_dir, quotas={"storage/IndexedDB": 1, "unknown": 1})
+    assert "unknown" not in manager.quotas
+
+    purge = manager.scan()
+    # 1.6 MB against a 1 MB quota: the two least recently used origins go
+    assert purge == ["storage/IndexedDB/older", "storage/IndexedDB/old"]
+    with open(manager.purge_file) as f:
+        assert json.load(f) == purge
+
+    # Nothing is deleted until the next launch
+    assert _exists(config_dir, "storage/IndexedDB/older")
+    gb.CacheManager(config_dir).startup()
+    assert not _exists(config_dir, "storage/IndexedDB/older")
+    assert not _exists(config_dir, "storage/IndexedDB/old")
+    assert _exists(config_dir, "storage/IndexedDB/new")
+    assert not os.path.exists(manager.purge_file)
+
+
+def test_scan_purges_whole_cache_without_units(gb, config_dir):
+    _touch(config_dir, "storage/Cache/big", 2 * 1024 * 1024)
+    manager = gb.CacheManager(config_dir, quotas={"storage/Cache": 1})
+    assert manager.scan() == ["storage/Cache"]
+    # A later scan under quota clears the pending purge
+    os.remove(os.path.join(config_dir, "storage", "Cache", "big"))
+    assert manager.scan() == []
+    assert not os.path.exists(manager.purge_file)
+
+
+def test_pending_purge_stays_inside_the_profile(gb, config_dir, tmp_path):
+    outside = tmp_path / "outside"
+    outside.mkdir()
+    (outside / "keep").write_text("x")
+    _write_purge(gb, config_dir, [
+        "../outside", "storage/../../outside", str(outside), "..", ".", "storage/Cache"])
+
+    gb.CacheManager(config_dir).startup()
+    assert (outside / "keep").exists()
+    assert os.path.isdir(config_dir)
+    assert not _exists(config_dir, "storage/Cache")
+    assert _exists(config_dir, "storage/GPUCache")
+
+
+def test_pending_purge_ignores_malformed_files(gb, config_dir):
+    with open(os.path.join(config_dir, os.path.basename(gb.CACHE_PURGE_FILE)), "w") as f:
+        f.write('{"storage/Cache": true}')
+    gb.CacheManager(config_dir).startup()
+    assert _exists(config_dir, "storage/Cache")
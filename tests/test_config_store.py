@@ -0,0 +1,96 @@
+import json
+import os
+
+import pytest
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "config" / "config.json")
+
+
+def _read(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_flush_writes_atomically_and_rotates_backup(gb, path):
+    store = gb.ConfigStore(path)
+    assert store.data == {}
+    store.data["home"] = "https://one.example/"
+    store.flush(wait=True)
+    assert _read(path) == {"home": "https://one.example/"}
+    assert not os.path.exists(store.backup_path)
+
+    store.data["home"] = "https://two.example/"
+    store.flush(wait=True)
+    assert _read(path) == {"home": "https://two.example/"}
+    assert _read(store.backup_path) == {"home": "https://one.example/"}
+    assert not os.path.exists(path + ".tmp")
+
+
+def test_collect_runs_before_each_snapshot(gb, path):
+    store = gb.ConfigStore(path, collect=lambda: store.data.update(tabs=3))
+    store.flush(wait=True)
+    assert _read(path) == {"tabs": 3}
+
+
+def test_load_falls_back_to_backup(gb, path):
+    store = gb.ConfigStore(path)
+    store.data["home"] = "https://one.example/"
+    store.flush(wait=True)
+    store.data["home"] = "https://two.example/"
+    store.flush(wait=True)
+
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('{"home": "https://tw')
+    assert gb.ConfigStore(path).data == {"home": "https://one.example/"}
+
+    os.remove(path)
+    assert gb.ConfigStore(path).data == {"home": "https://one.example/"}
+
+
+def test_unreadable_main_file_is_not_rotated_into_backup(gb, path):
+    store = gb.ConfigStore(path)
+    store.data["home"] = "https://one.example/"
+    store.flush(wait=True)
+    store.flush(wait=True)  # the backup now holds a good copy too
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("not json")
+
+    store = gb.ConfigStore(path)
+    store.data["zoom"] = 2
+    store.flush(wait=True)
+    assert _read(path) == {"home": "https://one.example/", "zoom": 2}
+    # The good backup was kept instead of being replaced by the corrupt file
+    assert _read(store.backup_path) == {"home": "https://one.example/"}
+
+    store.flush(wait=True)
+    assert _read(store.backup_path) == {"home": "https://one.example/", "zoom": 2}
+
+
+class _Timer:
+    def __init__(self):
+        self.intervals = []
+
+    def start(self, ms):
+        self.intervals.append(ms)
+
+    def stop(self):
+        pass
+
+
+def test_save_delay_is_capped(gb, path, monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr(gb.time, "monotonic", lambda: clock[0])
+    store = gb.ConfigStore(path)
+    store._timer = timer = _Timer()
+    # A change every second would keep restarting a plain debounce forever
+    for _ in range(7):
+        store.save()
+        clock[0] += 1.0
+    assert timer.intervals == [1500, 1500, 1500, 1500, 1000, 0, 0]
+
+    store.flush(wait=True)
+    store.save()
+    assert timer.intervals[-1] == 1500
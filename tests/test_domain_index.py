@@ -0,0 +1,26 @@
+def test_lookup_matches_host_and_parent_domains(gb):
+    index = gb.DomainSuffixIndex(["doubleclick.net", "Ads.Example.com."])
+    assert index.lookup("doubleclick.net") is True
+    assert index.lookup("stats.g.doubleclick.net") is True
+    assert index.lookup("ads.example.com") is True
+    assert index.lookup("cdn.ads.example.com") is True
+
+
+def test_lookup_does_not_match_partial_labels(gb):
+    index = gb.DomainSuffixIndex(["doubleclick.net"])
+    assert index.lookup("notdoubleclick.net") is None
+    assert index.lookup("doubleclick.net.evil.org") is None
+    assert index.lookup("net") is None
+    assert index.lookup("") is None
+
+
+def test_closest_suffix_value_wins(gb):
+    index = gb.DomainSuffixIndex()
+    index.add("example.com", "parent")
+    index.add("ads.example.com", "child")
+    assert index.lookup("x.ads.example.com") == "child"
+    assert index.lookup("www.example.com") == "parent"
+
+
+def test_empty_index(gb):
+    assert gb.DomainSuffixIndex().lookup("example.com") is None
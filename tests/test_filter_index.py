@@ -0,0 +1,112 @@
+import os
+
+import pytest
+
+LIST = """\
+! Title: test list
+[Adblock Plus 2.0]
+||tracker.example^
+||cdn.example^
+@@||cdn.example/player/
+/banner/ads.
+/popunder.$script,third-party
+@@/banner/ads.allowed
+||media.example^$image,domain=news.example|~sports.news.example
+/weird$unknown-option
+"""
+
+
+@pytest.fixture
+def filter_files(tmp_path):
+    filters_dir = tmp_path / "filters"
+    filters_dir.mkdir()
+    (filters_dir / "list.txt").write_text(LIST, encoding="utf-8")
+    return str(filters_dir), str(tmp_path / "filters.idx")
+
+
+def _bits(gb, name):
+    return gb.RESOURCE_TYPE_BITS[name]
+
+
+def test_parse_options(gb):
+    rule = gb.FilterRule.parse("/popunder.$script,third-party")
+    assert rule.third_party is True
+    assert rule.type_mask == _bits(gb, "script")
+    assert not rule.is_exception
+
+    rule = gb.FilterRule.parse("@@||example.com^$domain=a.example|~b.a.example")
+    assert rule.is_exception
+    assert rule.include_domains == {"a.example"}
+    assert rule.exclude_domains == {"b.a.example"}
+
+
+def test_parse_skips_comments_cosmetics_and_unknown_options(gb):
+    assert gb.FilterRule.parse("! comment") is None
+    assert gb.FilterRule.parse("[Adblock Plus 2.0]") is None
+    assert gb.FilterRule.parse("example.com##.ad") is None
+    assert gb.FilterRule.parse("/weird$unknown-option") is None
+    assert gb.FilterRule.parse("*") is None
+
+
+def _check_verdicts(gb, filters):
+    script, image = _bits(gb, "script"), _bits(gb, "image")
+    assert filters.host_verdict("x.tracker.example") is True
+    assert filters.host_verdict("unlisted.example") is None
+    # A path-level exception keeps cdn.example out of the host table
+    assert filters.host_verdict("cdn.example") is None
+    assert filters.rule_blocks("https://cdn.example/lib.js", "site.example", True, script)
+    assert filters.rule_allows("https://cdn.example/player/p.js", "site.example", True, script)
+
+    assert filters.rule_blocks("https://a.example/banner/ads.js", "a.example", False, script)
+    assert filters.rule_allows("https://a.example/banner/ads.allowed", "a.example", False, script)
+    assert filters.rule_blocks("https://x.example/popunder.js", "y.org", True, script)
+    assert not filters.rule_blocks("https://x.example/popunder.js", "x.example", False, script)
+
+    url = "https://media.example/pic.png"
+    assert filters.rule_blocks(url, "news.example", True, image)
+    assert not filters.rule_blocks(url, "sports.news.example", True, image)
+    assert not filters.rule_blocks(url, "other.example", True, image)
+    assert not filters.rule_blocks(url, "news.example", True, script)
+
+
+def test_mapped_cache_round_trip(gb, filter_files):
+    filters_dir, cache_file = filter_files
+    filters = gb.load_filter_set(filters_dir, cache_file)
+    assert os.path.exists(cache_file)
+    assert isinstance(filters.block_rules, gb._MappedRuleTable)
+    _check_verdicts(gb, filters)
+
+
+def test_in_memory_fallback_matches_mapped_cache(gb, filter_files):
+    filters_dir, _cache_file = filter_files
+    compiled = gb.compile_filter_lists(gb._filter_list_paths(filters_dir))
+    filters = gb.FilterSet.from_compiled(compiled)
+    _check_verdicts(gb, filters)
+    assert filters.rule_count == gb.load_filter_set(*filter_files).rule_count
+
+
+def test_stale_or_corrupt_cache_is_rejected(gb, filter_files):
+    filters_dir, cache_file = filter_files
+    gb.load_filter_set(filters_dir, cache_file)
+    paths = gb._filter_list_paths(filters_dir)
+    signature = gb._filter_signature(paths)
+    assert gb.FilterSet.open_cache(cache_file, signature) is not None
+    assert gb.FilterSet.open_cache(cache_file, signature[:-1] + [[]]) is None
+
+    with open(cache_file, "r+b") as f:
+        f.write(b"XXXX")
+    assert gb.FilterSet.open_cache(cache_file, signature) is None
+    # load_filter_set recompiles over the corrupt file
+    _check_verdicts(gb, gb.load_filter_set(filters_dir, cache_file))
+
+
+def test_lookup_caches_stay_bounded(gb, filter_files):
+    filters = gb.load_filter_set(*filter_files)
+    script = _bits(gb, "script")
+    for i in range(500):
+        filters.rule_blocks("https://a.example/s%d/x.js?cb=%d" % (i, i), "a.example", False, script)
+        filters.site_css("host%d.example" % i)
+    # Only tokens and domains that are in the tables get cached, not every one seen
+    assert len(filters.block_rules._buckets) <= len(filters.block_rules)
+    assert not filters.hide._domains
+    assert len(filters._css_cache) <= filters.CSS_CACHE_SIZE
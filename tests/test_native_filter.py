@@ -0,0 +1,105 @@
+import itertools
+import random
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+LIST = """\
+||tracker.example^
+||cdn.example^
+@@||cdn.example/player/
+@@||good.tracker.example^
+/banner/ads.
+/popunder.$script,third-party
+@@/banner/ads.allowed
+||media.example^$image,domain=news.example|~sports.news.example
+|https://start.example/only|
+://pixel.*/track^
+&ad_type=*&slot=
+.gif?id=^
+swf|
+/^https?:\\/\\/[a-z]{5}\\.example\\/$/$script
+||*.wild.example/x*y^
+-ads-*$~third-party
+"""
+
+URLS = [
+    "https://x.tracker.example/t.js", "https://good.tracker.example/a", "https://cdn.example/lib.js",
+    "https://cdn.example/player/p.js", "https://a.example/banner/ads.js", "https://a.example/banner/ads.allowed",
+    "https://x.example/popunder.js", "https://media.example/pic.png", "https://start.example/only",
+    "https://start.example/only/not", "http://start.example/only", "https://pixel.site.example/track",
+    "https://pixel.site.example/track?x", "https://pixel.site.example/tracking", "https://q.example/?a=1&ad_type=b&slot=2",
+    "https://q.example/i.gif?id=", "https://q.example/i.gif?id=1", "https://q.example/movie.swf",
+    "https://q.example/movie.swf?x", "https://abcde.example/", "https://abcdef.example/",
+    "https://s.wild.example/x1y/", "https://s.wild.example/x1y", "https://s.wild.example/x1yz",
+    "https://site.example/top-ads-1.png", "wss://evil.tracker.example/s", "noscheme/banner/ads.x",
+]
+HOSTS = ["news.example", "sports.news.example", "a.example", "x.example", "site.example", ""]
+
+
+@pytest.fixture(scope="module")
+def native_lib(gb, tmp_path_factory):
+    compiler = shutil.which("cc") or shutil.which("gcc") or shutil.which("clang")
+    if compiler is None or sys.platform == "win32":
+        pytest.skip("no C compiler to build gbfilter")
+    path = tmp_path_factory.mktemp("gbfilter") / gb._NATIVE_FILTER_LIB
+    source = gb.os.path.join(gb.os.path.dirname(gb.__file__), "gbfilter.c")
+    subprocess.run([compiler, "-O2", "-shared", "-fPIC", "-o", str(path), source], check=True)
+    return gb.NativeFilterMatcher._open_library(str(path))
+
+
+@pytest.fixture
+def filter_sets(gb, native_lib, tmp_path, monkeypatch):
+    monkeypatch.setattr(gb.NativeFilterMatcher, "_lib", native_lib)
+    monkeypatch.setattr(gb.NativeFilterMatcher, "_lib_loaded", True)
+    filters_dir = tmp_path / "filters"
+    filters_dir.mkdir()
+    (filters_dir / "list.txt").write_text(LIST, encoding="utf-8")
+    cache_file = str(tmp_path / "filters.idx")
+    native = gb.load_filter_set(str(filters_dir), cache_file, native=True)
+    python = gb.load_filter_set(str(filters_dir), cache_file)
+    assert native.native is not None and python.native is None
+    return native, python
+
+
+def _python_verdict(filters, url, first_party_host, third_party, type_bit, blocked):
+    blocked = blocked or filters.rule_blocks(url, first_party_host, third_party, type_bit)
+    return blocked and not filters.rule_allows(url, first_party_host, third_party, type_bit)
+
+
+def test_native_matches_python(gb, filter_sets):
+    native, python = filter_sets
+    for url, first_party_host, third_party, type_name, blocked in itertools.product(
+            URLS, HOSTS, (False, True), ("script", "image", "other"), (False, True)):
+        type_bit = gb.RESOURCE_TYPE_BITS[type_name]
+        host = gb.urlparse(url).hostname or ""
+        assert native.host_verdict(host) == python.host_verdict(host), host
+        expected = _python_verdict(python, url, first_party_host, third_party, type_bit, blocked)
+        assert native.url_verdict(url, first_party_host, third_party, type_bit, blocked) == expected, \
+            (url, first_party_host, third_party, type_name, blocked)
+
+
+def test_native_matches_python_on_random_urls(gb, filter_sets):
+    native, python = filter_sets
+    rng = random.Random(7)
+    parts = ["ads", "banner", "/", ".", "^", "?", "&", "=", "-", "x", "y", "1", "gif", "id", "track", "pixel",
+             "ad_type", "slot", "swf", "popunder", "tracker", "example", ":", "%20"]
+    script = gb.RESOURCE_TYPE_BITS["script"]
+    for _ in range(3000):
+        host = rng.choice(["tracker.example", "pixel.a.example", "s.wild.example", "q.example", "cdn.example"])
+        url = "https://%s/%s" % (host, "".join(rng.choice(parts) for _ in range(rng.randint(0, 12))))
+        third_party = rng.random() < 0.5
+        expected = _python_verdict(python, url, "site.example", third_party, script, False)
+        assert native.url_verdict(url, "site.example", third_party, script, False) == expected, url
+
+
+def test_regex_rules_fall_back_to_python(gb, filter_sets):
+    native, _python = filter_sets
+    script = gb.RESOURCE_TYPE_BITS["script"]
+    # Only an applicable /regex/ rule is left undecided by the library
+    assert native.native.url_verdict("https://zzzzz.example/", "a.example", True, script, False) is None
+    assert native.native.url_verdict("https://zzzzz.example/", "a.example", True, gb.RESOURCE_TYPE_BITS["image"], False) is False
+    assert native.url_verdict("https://abcde.example/", "a.example", True, script) is True
+    assert native.url_verdict("https://abcdef.example/", "a.example", True, script) is False
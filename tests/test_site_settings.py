@@ -0,0 +1,63 @@
+import pytest
+
+TABLE = {
+    "*": {"attributes": {"WebGLEnabled": False, "AutoLoadImages": True},
+          "permissions": {"Notifications": "deny"}},
+    "example.com": {"attributes": {"JavascriptEnabled": False},
+                    "permissions": {"Geolocation": "ask", "Notifications": "ask"}},
+    "https://maps.example.com/": {"attributes": {"JavascriptEnabled": True, "WebGLEnabled": True},
+                                  "permissions": {"Geolocation": "allow"}},
+    "http://maps.example.com:8080": {"attributes": {"AutoLoadImages": False}},
+}
+
+
+@pytest.fixture
+def sites(gb):
+    return gb.SiteSettings(TABLE)
+
+
+def _attributes(gb, sites, url):
+    attributes, _permissions = sites.lookup(gb.QUrl(url))
+    return {attr.name: value for attr, value in attributes.items()}
+
+
+def test_more_specific_keys_win(gb, sites):
+    assert _attributes(gb, sites, "https://other.org/") == {"WebGLEnabled": False, "AutoLoadImages": True}
+    assert _attributes(gb, sites, "https://www.example.com/a") == {
+        "WebGLEnabled": False, "AutoLoadImages": True, "JavascriptEnabled": False}
+    assert _attributes(gb, sites, "https://maps.example.com/x") == {
+        "WebGLEnabled": True, "AutoLoadImages": True, "JavascriptEnabled": True}
+    # An origin key only covers its own scheme and port
+    assert _attributes(gb, sites, "http://maps.example.com/") == {
+        "WebGLEnabled": False, "AutoLoadImages": True, "JavascriptEnabled": False}
+    assert _attributes(gb, sites, "http://maps.example.com:8080/") == {
+        "WebGLEnabled": False, "AutoLoadImages": False, "JavascriptEnabled": False}
+    # Domain keys match whole labels only
+    assert _attributes(gb, sites, "https://notexample.com/") == {"WebGLEnabled": False, "AutoLoadImages": True}
+
+
+def test_permissions(gb, sites):
+    feature = gb.QWebEnginePage.Feature
+    maps = gb.QUrl("https://maps.example.com/")
+    assert sites.permission(maps, feature.Geolocation) == "allow"
+    assert sites.permission(maps, feature.Notifications) == "ask"
+    assert sites.permission(gb.QUrl("https://example.com/"), feature.Geolocation) == "ask"
+    assert sites.permission(gb.QUrl("https://other.org/"), feature.Notifications) == "deny"
+    # Features nobody configured keep the old behaviour
+    assert sites.permission(gb.QUrl("https://other.org/"), feature.MediaAudioCapture) == "allow"
+
+
+def test_invalid_entries_are_ignored(gb):
+    sites = gb.SiteSettings({
+        "example.com": {"attributes": {"NoSuchAttribute": True, "WebGLEnabled": 0},
+                        "permissions": {"Geolocation": "sometimes"}},
+        "broken.example": "not a dict",
+    })
+    url = gb.QUrl("https://example.com/")
+    assert _attributes(gb, sites, "https://example.com/") == {"WebGLEnabled": False}
+    assert sites.permission(url, gb.QWebEnginePage.Feature.Geolocation) == "allow"
+    assert _attributes(gb, sites, "https://broken.example/") == {}
+
+
+def test_empty_table(gb):
+    assert gb.SiteSettings(None).lookup(gb.QUrl("https://example.com/")) == ({}, {})
@@ -0,0 +1,51 @@
+import random
+import re
+
+EXTRA_PATTERNS = ["/ad", "/ads/", "/adserver", r"ad[0-9]+\.js", r"track.*pixel", r"^https://start\.", "Mixed/Case"]
+
+URLS = [
+    "https://example.com/", "https://example.com/ad", "https://example.com/ads/x.png",
+    "https://example.com/adx", "https://example.com/a/d", "https://example.com/ad12.js",
+    "https://example.com/adx.js", "https://example.com/track/1/pixel.gif", "https://example.com/pixel/track",
+    "https://start.example.com/", "http://start.example.com/", "https://x.com/mixed/case",
+    "https://securepubads.g.doubleclick.net/tag/js/gpt.js", "https://www.googletagservices.com/tag/js/gpt.js",
+    "https://example.com/banner", "https://example.com/advertising", "https://example.com/sponsored/",
+]
+
+
+def _reference(patterns, url):
+    return any(re.search(p, url, re.I) for p in patterns)
+
+
+def test_matches_per_pattern_search(gb):
+    for patterns in (gb.AD_URL_PATTERNS, EXTRA_PATTERNS, gb.AD_URL_PATTERNS + EXTRA_PATTERNS):
+        matcher = gb.UrlPatternMatcher(patterns)
+        for url in URLS:
+            assert matcher.search(url) == _reference(patterns, url), (patterns, url)
+
+
+def test_literal_prefix_of_another_literal(gb):
+    matcher = gb.UrlPatternMatcher(["/ads/", "/ad"])
+    assert matcher.search("https://a.example/adx")
+    assert matcher.search("https://a.example/ads/")
+    assert not matcher.search("https://a.example/a/d")
+    # The shorter literal ends the branch, so the alternation stays prefix-factored
+    assert gb._literal_trie_regex(["/ads/", "/ad"]) == re.escape("/ad")
+    assert gb._literal_trie_regex(["/ab", "/ac"]) == "/a(?:b|c)"
+
+
+def test_random_urls_agree_with_reference(gb):
+    rng = random.Random(3)
+    patterns = gb.AD_URL_PATTERNS + EXTRA_PATTERNS
+    matcher = gb.UrlPatternMatcher(patterns)
+    pieces = ["/", "ad", "s", "ads", "banner", "track", "pixel", ".js", "1", "x", "doubleclick", "sponsor", "ed",
+              "https://", "start.", "mixed/case", "page", "advert"]
+    for _ in range(5000):
+        url = "".join(rng.choice(pieces) for _ in range(rng.randint(1, 8)))
+        assert matcher.search(url) == _reference(patterns, url), url
+
+
+def test_empty_matcher(gb):
+    matcher = gb.UrlPatternMatcher([])
+    assert not matcher.search("https://example.com/ads/")
+    assert not gb.UrlPatternMatcher([""]).search("https://example.com/")